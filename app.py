@@ -1,11 +1,11 @@
 import os
 import threading
 import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import streamlit as st
-import pandas as pd
-import numpy as np
-from model import CreditRiskModel
-from preprocessing import preprocess_input
+
+# Longest a session waits for its batched score, including a cold model load
+SCORE_TIMEOUT_SECONDS = 30
 
 def _start_idle_shutdown_monitor():
     # Periodically check if there are any active sessions; if none, exit the process.
@@ -77,7 +77,7 @@ def show_prediction_page():
         # Personal Information
         st.subheader("Personal Details")
         age = st.number_input("Age", min_value=18, max_value=100, value=25)
-        income = st.number_input("Annual Income ($)", min_value=0, value=50000)
+        income = st.number_input("Annual Income ($)", min_value=1, value=50000)
         
         # Home Ownership
         home_ownership = st.selectbox(
@@ -113,14 +113,6 @@ def show_prediction_page():
         
         if st.button("Assess Credit Risk"):
             with st.spinner('Analyzing credit risk...'):
-                # Create a progress bar
-                progress_bar = st.progress(0)
-                
-                # Simulate processing
-                for percent_complete in range(100):
-                    time.sleep(0.01)  # Simulate processing time
-                    progress_bar.progress(percent_complete + 1)
-                
                 # Prepare input data
                 input_data = {
                     'person_age': age,
@@ -133,16 +125,21 @@ def show_prediction_page():
                     'cb_person_default_on_file': cb_person_default_on_file
                 }
                 
-                # Preprocess input
-                processed_data = preprocess_input(input_data)
+                # Imported on first use so the page renders before pandas is loaded
+                from batching import submit_applicant
                 
-                # Initialize and load model
-                model = CreditRiskModel()
-                model.load_models()
-                
-                # Make predictions
-                risk_prob = model.predict_risk(processed_data)
-                interest_rate = model.predict_interest_rate(processed_data)
+                # Requests from all sessions are scored together in small batches
+                try:
+                    risk_prob, interest_rate = submit_applicant(input_data).result(timeout=SCORE_TIMEOUT_SECONDS)
+                except FutureTimeoutError:
+                    st.error("Scoring is taking longer than expected. Please try again in a moment.")
+                    return
+                except FileNotFoundError:
+                    st.error("No trained models were found. Run `python model.py train` and try again.")
+                    return
+                except ValueError as e:
+                    st.error(f"These details cannot be scored: {e}")
+                    return
                 
                 # Display results
                 st.subheader("Risk Assessment")
@@ -0,0 +1,176 @@
+"""
+Single-file, memory-mappable model artifact bundle.
+
+A bundle is an 8-byte magic string, the length of a JSON manifest, the
+manifest itself, and then one raw block per array, each aligned to 64 bytes.
+The manifest records the format version, the dtype/shape/offset of every
+block, free-form metadata and the SHA-256 of everything after the manifest.
+
+read_bundle maps the file once and returns the arrays as read-only views
+into that mapping. No data is copied, so every process that loads the same
+bundle shares one physical copy of the arrays through the page cache. Only
+the arrays are shared this way: pickled objects stored in a block, such as
+the sklearn models, are unpickled into a private copy by each process.
+
+write_bundle writes to a temporary file in the same directory and renames it
+over the old bundle, so a model swap never exposes a half-written file.
+Windows cannot replace a file while any process has it mapped, so there
+read_bundle reads the payload into memory instead of mapping it.
+
+shared_bundle reads a models directory's bundle once per process and again
+only when the file changes on disk. shared_object builds objects such as
+the NumPy scorer and the drift monitor from that one read, so the payload
+is mapped and checksummed once however many of them are used.
+"""
+import hashlib
+import json
+import os
+import struct
+import threading
+import numpy as np
+from metrics import metrics
+
+# File name of the bundle inside a models directory
+BUNDLE_NAME = 'model.bundle'
+
+MAGIC = b'CRMBNDL\x00'
+BUNDLE_FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# Whether read_bundle memory-maps the payload; see the module docstring
+MEMORY_MAP = os.name != 'nt'
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def write_bundle(path, arrays, metadata=None):
+    """Atomically write a dict of arrays and JSON-serializable metadata to path"""
+    arrays = {name: np.asarray(value, order='C') for name, value in arrays.items()}
+    for name, value in arrays.items():
+        if value.dtype.hasobject:
+            raise ValueError(f'block {name!r} has dtype object, which cannot be memory-mapped')
+
+    # Block offsets are relative to the start of the payload
+    blocks = {}
+    offset = 0
+    for name, value in arrays.items():
+        offset = _aligned(offset)
+        blocks[name] = {'dtype': value.dtype.str, 'shape': list(value.shape),
+                        'offset': offset, 'nbytes': value.nbytes}
+        offset += value.nbytes
+    payload = bytearray(offset)
+    for name, value in arrays.items():
+        start = blocks[name]['offset']
+        payload[start:start + value.nbytes] = value.tobytes()
+
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'metadata': metadata or {},
+        'blocks': blocks,
+        'sha256': hashlib.sha256(payload).hexdigest(),
+    }
+    header = json.dumps(manifest).encode('utf-8')
+    # Pad the manifest so the payload, and therefore every block, starts aligned
+    header += b' ' * (_aligned(len(MAGIC) + 8 + len(header)) - len(MAGIC) - 8 - len(header))
+
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def read_manifest(path):
+    """Return the manifest of the bundle at path and the file offset of its payload"""
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a model bundle')
+        (header_length,) = struct.unpack('<Q', f.read(8))
+        manifest = json.loads(f.read(header_length))
+    if manifest.get('format_version', 0) > BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"{path} has bundle format {manifest['format_version']}; "
+                         f"this version reads up to {BUNDLE_FORMAT_VERSION}")
+    return manifest, len(MAGIC) + 8 + header_length
+
+def read_bundle(path, verify=True):
+    """Memory-map the bundle at path and return (manifest, dict of read-only arrays)
+
+    Where MEMORY_MAP is off the payload is read into memory instead.
+
+    With verify=True the payload checksum is compared against the manifest
+    and a mismatch raises ValueError.
+    """
+    manifest, payload_offset = read_manifest(path)
+    payload_size = max((block['offset'] + block['nbytes'] for block in manifest['blocks'].values()), default=0)
+    if os.path.getsize(path) < payload_offset + payload_size:
+        raise ValueError(f'{path} is truncated')
+    if payload_size == 0:
+        payload = np.zeros(0, dtype=np.uint8)
+    elif MEMORY_MAP:
+        payload = np.memmap(path, dtype=np.uint8, mode='r', offset=payload_offset, shape=(payload_size,))
+    else:
+        payload = np.fromfile(path, dtype=np.uint8, count=payload_size, offset=payload_offset)
+        payload.flags.writeable = False
+
+    if verify and hashlib.sha256(payload).hexdigest() != manifest['sha256']:
+        raise ValueError(f'{path} is corrupt: payload checksum does not match its manifest')
+
+    arrays = {}
+    for name, block in manifest['blocks'].items():
+        raw = payload[block['offset']:block['offset'] + block['nbytes']]
+        arrays[name] = raw.view(np.dtype(block['dtype'])).reshape(tuple(block['shape']))
+    return manifest, arrays
+
+# Process-wide bundle reads: absolute path -> [(mtime, size), manifest, arrays, {name: built object}]
+_bundles = {}
+_bundles_lock = threading.Lock()
+
+def _shared_entry(models_dir):
+    path = os.path.abspath(os.path.join(models_dir, BUNDLE_NAME))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    signature = (stat.st_mtime_ns, stat.st_size)
+    entry = _bundles.get(path)
+    if entry is None or entry[0] != signature:
+        metrics.inc('bundle_reads')
+        manifest, arrays = read_bundle(path)
+        entry = _bundles[path] = [signature, manifest, arrays, {}]
+    return entry
+
+def shared_bundle(models_dir='models'):
+    """Return (manifest, arrays) of the bundle in models_dir, or None if it has none
+
+    The bundle is read once per process and re-read only when it changes on disk.
+    """
+    with _bundles_lock:
+        entry = _shared_entry(models_dir)
+    return None if entry is None else (entry[1], entry[2])
+
+def shared_object(models_dir, name, build):
+    """Return build(manifest, arrays) for the bundle in models_dir, or None if it has none
+
+    The result is kept under name until the bundle changes on disk, so every
+    caller gets the same object for the same bundle.
+    """
+    with _bundles_lock:
+        entry = _shared_entry(models_dir)
+        if entry is None:
+            return None
+        objects = entry[3]
+        if name in objects:
+            metrics.inc(f'{name}_cache_hits')
+        else:
+            metrics.inc(f'{name}_cache_misses')
+            objects[name] = build(entry[1], entry[2])
+        return objects[name]
@@ -0,0 +1,127 @@
+"""
+Micro-batching of concurrent scoring requests.
+
+MicroBatcher collects requests submitted from any thread into a queue. A
+background thread drains the queue, waiting at most max_wait_ms after the
+first request for more to arrive, and scores each batch with one vectorized
+call. Every caller gets a Future, so many concurrent sessions cost one
+predict call per batch instead of one per session.
+
+submit_applicant is the entry point used by the Streamlit app. It shares
+one batcher per models directory and answers repeated applicants from
+result_cache.applicant_cache without queueing them.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import drift
+from metrics import metrics
+from model import applicant_cache_key, score_batch
+from result_cache import applicant_cache
+
+class MicroBatcher:
+    """Coalesces requests from many threads into batched calls of score_fn
+
+    score_fn takes a list of items and returns one result per item.
+    """
+    def __init__(self, score_fn, max_batch=256, max_wait_ms=5.0):
+        self.score_fn = score_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, item):
+        """Queue item for scoring and return a Future of its result"""
+        future = Future()
+        self._queue.put((item, future))
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                    self._thread.start()
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            # Skip requests whose callers cancelled them; the rest can no longer be cancelled
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            try:
+                if batch:
+                    self._score(batch)
+            except Exception as e:
+                # This is the only scoring thread, so fail the batch rather than the thread
+                metrics.inc('microbatch_errors')
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _score(self, batch):
+        metrics.inc('microbatch_batches')
+        metrics.inc('microbatch_requests', len(batch))
+        try:
+            with metrics.span('microbatch'):
+                results = self.score_fn([item for item, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # Score one at a time so a single bad request only fails its own caller
+            for entry in batch:
+                self._score([entry])
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+# Process-wide batchers, keyed by absolute models directory
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+def get_batcher(models_dir='models'):
+    """Return the shared MicroBatcher scoring applicant dicts against models_dir"""
+    key = os.path.abspath(models_dir)
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None:
+            def score_fn(applicants):
+                risk_probs, interest_rates = score_batch(applicants, models_dir)
+                return list(zip(risk_probs, interest_rates))
+            batcher = _batchers[key] = MicroBatcher(score_fn)
+        return batcher
+
+def submit_applicant(input_data, models_dir='models'):
+    """Score one applicant dict on the shared batcher
+
+    Returns a Future of (probability of default, interest rate). Applicants
+    already in applicant_cache resolve immediately, though they are still
+    recorded for drift monitoring.
+    """
+    key = applicant_cache_key(input_data, models_dir)
+    result = applicant_cache.get(key)
+    if result is not None:
+        drift.record_applicant(input_data, models_dir)
+        future = Future()
+        future.set_result(result)
+        return future
+
+    future = get_batcher(models_dir).submit(input_data)
+
+    def _remember(done):
+        if done.exception() is None:
+            applicant_cache.put(key, done.result())
+    future.add_done_callback(_remember)
+    return future
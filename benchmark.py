@@ -0,0 +1,273 @@
+"""
+Benchmarks for the preprocessing, training and inference hot paths.
+
+Generates synthetic applicants with the same schema as credit_risk_dataset.csv,
+times each stage at several dataset sizes and writes latency percentiles,
+throughput and peak memory to a JSON file. Pass --compare with an earlier
+results file to flag regressions. --startup instead profiles import times and
+measures time-to-first-prediction in a fresh interpreter.
+
+    python benchmark.py --sizes 1000 100000 10000000 --output bench.json
+    python benchmark.py --output new.json --compare bench.json
+    python benchmark.py --startup --output startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import artifact_bundle
+from model import CreditRiskModel
+from preprocessing import (DataPreprocessor, load_and_preprocess_data, preprocess_batch,
+                           preprocess_input, preprocess_row)
+
+GRADES = ['A', 'B', 'C', 'D', 'E', 'F', 'G']
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+APPLICANT = {
+    'person_age': 30, 'person_income': 55000, 'person_home_ownership': 'RENT',
+    'person_emp_length': 4, 'loan_intent': 'PERSONAL', 'loan_amnt': 9000,
+    'cb_person_cred_hist_length': 5, 'cb_person_default_on_file': 'N',
+}
+
+# Cold-start scoring paths, each run in a fresh interpreter
+STARTUP_SNIPPETS = {
+    'first_prediction[sklearn]': (
+        "from model import get_model; from preprocessing import preprocess_input; "
+        "get_model({models_dir!r}).predict_all(preprocess_input({applicant!r}))"
+    ),
+    'first_prediction[numpy]': (
+        "from model import score_applicant; score_applicant({applicant!r}, {models_dir!r})"
+    ),
+}
+
+def make_synthetic_applicants(n_rows, seed=0):
+    """Synthetic loan book with the columns and rough distributions of the real dataset"""
+    rng = np.random.default_rng(seed)
+    grade_index = rng.choice(len(GRADES), n_rows, p=[0.33, 0.32, 0.2, 0.11, 0.03, 0.007, 0.003])
+    income = np.round(rng.lognormal(10.9, 0.55, n_rows), -2)
+    loan_amnt = np.round(np.clip(rng.lognormal(8.9, 0.65, n_rows), 500, 35000), -1)
+    emp_length = rng.poisson(4.5, n_rows).astype(np.float64)
+    emp_length[rng.random(n_rows) < 0.03] = np.nan
+    int_rate = np.round(7.5 + 2.6 * grade_index + rng.normal(0, 1.2, n_rows), 2)
+    int_rate[rng.random(n_rows) < 0.1] = np.nan
+    default_logit = -2.2 + 0.55 * grade_index + 6 * (loan_amnt / income) - 0.1 * np.log1p(emp_length.clip(0, 40))
+    data = pd.DataFrame({
+        'person_age': np.clip(rng.gamma(9, 3.1, n_rows), 20, 80).round(),
+        'person_income': income,
+        'person_home_ownership': rng.choice(['RENT', 'MORTGAGE', 'OWN', 'OTHER'], n_rows, p=[0.5, 0.41, 0.08, 0.01]),
+        'person_emp_length': emp_length,
+        'loan_intent': rng.choice(
+            ['EDUCATION', 'MEDICAL', 'VENTURE', 'PERSONAL', 'DEBTCONSOLIDATION', 'HOMEIMPROVEMENT'], n_rows),
+        'loan_grade': np.array(GRADES)[grade_index],
+        'loan_amnt': loan_amnt,
+        'loan_int_rate': int_rate,
+        'loan_status': (rng.random(n_rows) < 1 / (1 + np.exp(-default_logit))).astype(np.int64),
+        'loan_percent_income': np.round(loan_amnt / income, 2),
+        'cb_person_default_on_file': np.where(grade_index >= 3, 'Y', 'N'),
+        'cb_person_cred_hist_length': rng.integers(2, 30, n_rows),
+    })
+    return data
+
+def _percentile_ms(latencies, q):
+    return float(np.percentile(latencies, q) * 1000)
+
+def measure(stage, n_rows, fn, repeats=5, setup=None):
+    """Time fn repeats times, then once more under tracemalloc for peak memory
+
+    Peak memory is what tracemalloc sees (Python and NumPy allocations), so it
+    does not include buffers allocated outside Python such as the CSV parser's.
+    """
+    latencies = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return _summarize(stage, n_rows, latencies, peak / (1024 * 1024))
+
+def _summarize(stage, n_rows, latencies, peak_mb):
+    mean = float(np.mean(latencies))
+    result = {
+        'stage': stage,
+        'rows': n_rows,
+        'repeats': len(latencies),
+        'p50_ms': _percentile_ms(latencies, 50),
+        'p90_ms': _percentile_ms(latencies, 90),
+        'p99_ms': _percentile_ms(latencies, 99),
+        'mean_ms': mean * 1000,
+        'rows_per_sec': n_rows / mean if mean > 0 else None,
+        'peak_mb': peak_mb,
+    }
+    peak = f"{peak_mb:8.1f} MB" if peak_mb is not None else "     n/a"
+    print(f"{stage:<28} {n_rows:>10} rows  p50 {result['p50_ms']:10.3f} ms  "
+          f"p99 {result['p99_ms']:10.3f} ms  peak {peak}")
+    return result
+
+def run_benchmarks(sizes, repeats=5, single_row_repeats=200):
+    """Run every stage at every dataset size and return the list of results"""
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_rows in sizes:
+            csv_path = os.path.join(workdir, f'synthetic_{n_rows}.csv')
+            make_synthetic_applicants(n_rows).to_csv(csv_path, index=False)
+
+            results.append(measure('load_and_preprocess_data', n_rows,
+                                   lambda: load_and_preprocess_data(csv_path), repeats))
+            data = load_and_preprocess_data(csv_path)
+            features = data.drop(['loan_status', 'loan_int_rate'], axis=1)
+
+            preprocessor = DataPreprocessor()
+            results.append(measure('DataPreprocessor.fit', n_rows, lambda: preprocessor.fit(features), repeats))
+            results.append(measure('DataPreprocessor.transform', n_rows,
+                                   lambda: preprocessor.transform(features), repeats))
+
+            models_dir = os.path.join(workdir, f'models_{n_rows}')
+            trainer = CreditRiskModel(models_dir, cache_dir=None)
+            results.append(measure('CreditRiskModel.train_models', n_rows,
+                                   lambda: trainer.train_models(csv_path), repeats=1))
+
+            model = CreditRiskModel(models_dir)
+            # Drop the process-wide bundle read first, so every repeat reads and verifies the file
+            results.append(measure('CreditRiskModel.load_models', 1, model.load_models, repeats,
+                                   setup=artifact_bundle._bundles.clear))
+            results.append(measure('CreditRiskModel.predict_batch', n_rows,
+                                   lambda: model.predict_batch(features), repeats))
+            results.append(measure('CreditRiskModel.explain_batch', n_rows,
+                                   lambda: model.explain_batch(features, top_k=3), repeats))
+            results.append(measure('CreditRiskModel.predict_and_explain', n_rows,
+                                   lambda: model.predict_and_explain(features, top_k=3), repeats))
+
+            single_row = preprocess_input(APPLICANT)
+            results.append(measure('CreditRiskModel.predict_risk', 1,
+                                   lambda: model.predict_risk(single_row), single_row_repeats))
+
+            # Per-row input preparation: pandas single row, pandas-free single row, and bulk
+            results.append(measure('preprocess_input', 1, lambda: preprocess_input(APPLICANT), single_row_repeats))
+            results.append(measure('preprocess_row', 1, lambda: preprocess_row(APPLICANT), single_row_repeats))
+            records = [APPLICANT] * n_rows
+            results.append(measure('preprocess_batch', n_rows, lambda: preprocess_batch(records), repeats))
+    return results
+
+def profile_imports(module, top=15):
+    """Return the top modules by cumulative import time when importing module
+
+    Runs a fresh interpreter with -X importtime and returns a list of
+    {'module', 'self_ms', 'cumulative_ms'} dicts, slowest first.
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True
+    )
+    timings = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings.append({
+            'module': name.strip(),
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+        })
+    timings.sort(key=lambda timing: timing['cumulative_ms'], reverse=True)
+    return timings[:top]
+
+def run_startup_benchmarks(repeats=5):
+    """Measure time-to-first-prediction of each cold-start path in a fresh interpreter"""
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = os.path.join(workdir, 'synthetic.csv')
+        make_synthetic_applicants(10000).to_csv(csv_path, index=False)
+        models_dir = os.path.join(workdir, 'models')
+        CreditRiskModel(models_dir, cache_dir=None).train_models(csv_path)
+
+        for stage, snippet in STARTUP_SNIPPETS.items():
+            code = snippet.format(models_dir=models_dir, applicant=APPLICANT)
+            latencies = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, '-c', code], cwd=REPO_DIR, check=True)
+                latencies.append(time.perf_counter() - start)
+            results.append(_summarize(stage, 1, latencies, None))
+    return results
+
+def compare(results, baseline, threshold):
+    """Return (stage, rows, old p50, new p50) for stages whose p50 grew by more than threshold"""
+    previous = {(r['stage'], r['rows']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get((result['stage'], result['rows']))
+        if old is not None and result['p50_ms'] > old['p50_ms'] * (1 + threshold):
+            regressions.append((result['stage'], result['rows'], old['p50_ms'], result['p50_ms']))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the credit risk hot paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='synthetic dataset sizes in rows (up to 10M)')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', default=None, help='earlier results file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative p50 slowdown that counts as a regression')
+    parser.add_argument('--startup', action='store_true',
+                        help='profile imports and time-to-first-prediction instead of the size sweep')
+    args = parser.parse_args()
+
+    import sklearn
+    import_profile = None
+    if args.startup:
+        results = run_startup_benchmarks(args.repeats)
+        import_profile = profile_imports('app')
+        print("Slowest imports for 'import app' (cumulative ms):")
+        for timing in import_profile:
+            print(f"  {timing['cumulative_ms']:10.1f}  {timing['module']}")
+    else:
+        results = run_benchmarks(args.sizes, args.repeats)
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'sklearn': sklearn.__version__,
+        },
+        'results': results,
+    }
+    if import_profile is not None:
+        report['import_profile'] = import_profile
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for stage, n_rows, old, new in regressions:
+            print(f"REGRESSION {stage} at {n_rows} rows: p50 {old:.3f} ms -> {new:.3f} ms")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
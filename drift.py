@@ -0,0 +1,193 @@
+"""
+Drift and data-quality monitoring of scored applicants.
+
+save_models stores a baseline of the training data in the model bundle. For
+each numerical column it stores quantile bin edges from the preprocessor's
+quantile sketches and the training count in each bin plus a missing-value
+bin. For each categorical column it stores the training count of every
+category. DriftMonitor keeps the same fixed bins for live traffic, plus one
+bin for categories the encoder never saw, so its memory does not grow with
+the number of rows. Comparing the two (PSI for every column, KS for
+numerical ones) costs O(bins) and never rescans scored data.
+
+Monitoring of the scoring functions in model.py is off unless the
+CREDIT_RISK_DRIFT environment variable is set to a non-zero value or
+enable_monitoring() is called.
+"""
+import os
+import threading
+import numpy as np
+
+from artifact_bundle import shared_bundle, shared_object
+from preprocessing import preprocess_row
+
+# Floor applied to bin fractions so empty bins do not make PSI infinite
+PSI_EPSILON = 1e-4
+
+# Conventional PSI level above which a column's shift is considered significant
+PSI_ALERT_THRESHOLD = 0.25
+
+def baseline_arrays(preprocessor, n_bins=10):
+    """Training-data baseline of preprocessor as arrays for the model bundle
+
+    Returns an empty dict for preprocessors pickled before running statistics
+    were recorded.
+    """
+    stats = getattr(preprocessor, 'stats', None)
+    if stats is None:
+        return {}
+
+    arrays = {
+        'drift_numerical_cols': np.array(preprocessor.numerical_cols),
+        'drift_categorical_cols': np.array(preprocessor.categorical_cols),
+    }
+    for i, col in enumerate(preprocessor.numerical_cols):
+        sketch = stats.sketches[col]
+        edges = np.unique([sketch.quantile(q) for q in np.arange(1, n_bins) / n_bins])
+        edges = edges[np.isfinite(edges)]
+        keys = np.array(list(sketch.counts), dtype=np.float64)
+        counts = np.array(list(sketch.counts.values()), dtype=np.float64)
+        binned = np.bincount(np.searchsorted(edges, keys, side='right'), weights=counts, minlength=len(edges) + 1)
+        arrays[f'drift_edges_{i}'] = edges
+        # The last bin counts missing values
+        arrays[f'drift_counts_{i}'] = np.append(binned, stats.n_missing[i])
+    for i, (col, categories) in enumerate(zip(preprocessor.categorical_cols, preprocessor.encoder.categories_)):
+        names = np.sort(np.array([str(category) for category in categories]))
+        counts = stats.category_counts[col]
+        arrays[f'drift_categories_{i}'] = names
+        # The last bin counts categories unknown to the encoder, which training never has
+        arrays[f'drift_category_counts_{i}'] = np.array(
+            [counts.get(name, 0) for name in names] + [0], dtype=np.float64
+        )
+    return arrays
+
+def _psi(live, baseline):
+    live = np.maximum(live / max(live.sum(), 1), PSI_EPSILON)
+    baseline = np.maximum(baseline / max(baseline.sum(), 1), PSI_EPSILON)
+    return float(np.sum((live - baseline) * np.log(live / baseline)))
+
+def _ks(live, baseline):
+    # KS statistic evaluated at the bin edges, over the non-missing values
+    live_cdf = np.cumsum(live) / max(live.sum(), 1)
+    baseline_cdf = np.cumsum(baseline) / max(baseline.sum(), 1)
+    return float(np.max(np.abs(live_cdf - baseline_cdf)))
+
+class DriftMonitor:
+    """Fixed-bin running summaries of scored rows, compared against a training baseline"""
+    def __init__(self, arrays):
+        self.numerical_cols = arrays['drift_numerical_cols'].tolist()
+        self.categorical_cols = arrays['drift_categorical_cols'].tolist()
+        self.edges = [arrays[f'drift_edges_{i}'] for i in range(len(self.numerical_cols))]
+        self.baseline_counts = [arrays[f'drift_counts_{i}'] for i in range(len(self.numerical_cols))]
+        self.categories = [arrays[f'drift_categories_{i}'] for i in range(len(self.categorical_cols))]
+        self.baseline_category_counts = [arrays[f'drift_category_counts_{i}']
+                                         for i in range(len(self.categorical_cols))]
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def from_bundle(cls, manifest, arrays):
+        """Build a monitor from a bundle's manifest and arrays, or return None if it has no baseline"""
+        if 'drift_numerical_cols' not in arrays:
+            return None
+        return cls(arrays)
+
+    def reset(self):
+        """Discard everything observed so far"""
+        with self._lock:
+            self.rows = 0
+            self.counts = [np.zeros(len(counts), dtype=np.int64) for counts in self.baseline_counts]
+            self.category_counts = [np.zeros(len(counts), dtype=np.int64)
+                                    for counts in self.baseline_category_counts]
+
+    def update(self, columns):
+        """Fold a batch of preprocessed rows into the running summaries
+
+        columns maps each input column name to a sequence of values, e.g. a
+        DataFrame or the dict returned by preprocessing.preprocess_row.
+        """
+        n_rows, counts = self._bin(columns)
+        self.add_counts((n_rows, *counts))
+
+    def _bin(self, columns):
+        n_rows = len(columns[self.numerical_cols[0]])
+        numeric = []
+        for col, edges, baseline in zip(self.numerical_cols, self.edges, self.baseline_counts):
+            values = np.asarray(columns[col], dtype=np.float64)
+            bins = np.where(np.isnan(values), len(edges) + 1, np.searchsorted(edges, values, side='right'))
+            numeric.append(np.bincount(bins, minlength=len(baseline)))
+        categorical = []
+        for col, names in zip(self.categorical_cols, self.categories):
+            values = np.asarray(columns[col]).astype(str)
+            index = np.minimum(np.searchsorted(names, values), len(names) - 1)
+            # Unknown categories all land in the extra last bin
+            bins = np.where(names[index] == values, index, len(names))
+            categorical.append(np.bincount(bins, minlength=len(names) + 1))
+        return n_rows, (numeric, categorical)
+
+    def counts_snapshot(self):
+        """(rows, numerical bin counts, category counts), e.g. to merge into another monitor"""
+        with self._lock:
+            return self.rows, [c.copy() for c in self.counts], [c.copy() for c in self.category_counts]
+
+    def add_counts(self, counts):
+        """Add counts from counts_snapshot() of a monitor over the same baseline"""
+        n_rows, numeric, categorical = counts
+        with self._lock:
+            self.rows += n_rows
+            for total, added in zip(self.counts, numeric):
+                total += added
+            for total, added in zip(self.category_counts, categorical):
+                total += added
+
+    def report(self):
+        """PSI and KS per column, with missing and unknown-category rates, as a plain dict"""
+        n_rows, numeric, categorical = self.counts_snapshot()
+        columns = {}
+        for col, live, baseline in zip(self.numerical_cols, numeric, self.baseline_counts):
+            columns[col] = {
+                'psi': _psi(live, baseline),
+                'ks': _ks(live[:-1], baseline[:-1]),
+                'missing_rate': float(live[-1] / n_rows) if n_rows else 0.0,
+                'baseline_missing_rate': float(baseline[-1] / max(baseline.sum(), 1)),
+            }
+        for col, live, baseline in zip(self.categorical_cols, categorical, self.baseline_category_counts):
+            columns[col] = {
+                'psi': _psi(live, baseline),
+                'unknown_rate': float(live[-1] / n_rows) if n_rows else 0.0,
+            }
+        return {'rows': n_rows, 'columns': columns}
+
+# Off unless CREDIT_RISK_DRIFT is set or enable_monitoring() is called
+monitoring_enabled = os.environ.get('CREDIT_RISK_DRIFT', '0') not in ('', '0')
+
+def enable_monitoring():
+    global monitoring_enabled
+    monitoring_enabled = True
+
+def get_monitor(models_dir='models'):
+    """Return the shared DriftMonitor for models_dir, or None if its bundle has no baseline
+
+    The monitor is built from artifact_bundle.shared_bundle, the same read the
+    NumPy scorer uses. A new monitor, with empty summaries, replaces it
+    whenever the bundle changes on disk, since the baseline changes with it.
+    """
+    return shared_object(models_dir, 'drift_monitor', DriftMonitor.from_bundle)
+
+def new_monitor(models_dir='models'):
+    """Return a private, empty DriftMonitor for models_dir, or None if its bundle has no baseline"""
+    bundle = shared_bundle(models_dir)
+    return None if bundle is None else DriftMonitor.from_bundle(*bundle)
+
+def record(columns, models_dir='models'):
+    """Fold scored rows into the shared monitor for models_dir when monitoring is enabled"""
+    if not monitoring_enabled:
+        return
+    monitor = get_monitor(models_dir)
+    if monitor is not None:
+        monitor.update(columns)
+
+def record_applicant(input_data, models_dir='models'):
+    """record() for one applicant dict, e.g. one answered from a result cache without scoring"""
+    if monitoring_enabled:
+        record(preprocess_row(input_data), models_dir)
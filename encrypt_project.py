@@ -15,7 +15,7 @@ def encrypt_project():
     
     # Files to exclude from encryption
     exclude_files = {'encrypt_project.py', 'run_encrypted.py', 'launch.py', 'launch.spec', 'credit_risk_dataset.csv'}
-    exclude_dirs = {'dist', 'build', '.git', '__pycache__', 'models'}
+    exclude_dirs = {'dist', 'build', '.git', '__pycache__', 'models', 'data_cache'}
     
     # Files to copy without encryption
     copy_files = {'credit_risk_dataset.csv', 'requirements.txt'}
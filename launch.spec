@@ -1,7 +1,7 @@
 # -*- mode: python ; coding: utf-8 -*-
 from PyInstaller.utils.hooks import collect_data_files, copy_metadata, collect_submodules
 
-datas = [('app.py', '.'), ('model.py', '.'), ('preprocessing.py', '.'), ('models', 'models'), ('credit_risk_dataset.csv', '.')]
+datas = [('app.py', '.'), ('model.py', '.'), ('preprocessing.py', '.'), ('numpy_inference.py', '.'), ('metrics.py', '.'), ('result_cache.py', '.'), ('artifact_bundle.py', '.'), ('batching.py', '.'), ('drift.py', '.'), ('models', 'models'), ('credit_risk_dataset.csv', '.')]
 binaries = []
 hiddenimports = ['sklearn.impute']
 # Ensure Streamlit's scriptrunner dynamic imports are bundled
@@ -0,0 +1,157 @@
+"""
+Timing spans and counters for the scoring hot path.
+
+Instrumentation is off unless the CREDIT_RISK_METRICS environment variable is
+set to a non-zero value or metrics.enable() is called. While off, span()
+returns a shared no-op context manager and inc()/observe() return at once, so
+the cost at each call site is a single attribute check.
+
+Collected metrics can be rendered in the Prometheus text format with
+to_prometheus() or appended to a local JSON-lines log with write_json().
+"""
+import bisect
+import functools
+import json
+import os
+import re
+import threading
+import time
+from contextlib import nullcontext
+
+# Upper bounds in seconds of the latency histogram buckets (Prometheus 'le' labels)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_NOOP_SPAN = nullcontext()
+
+class _Span:
+    __slots__ = ('registry', 'name', 'start')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+class MetricsRegistry:
+    """Thread-safe counters and per-stage latency histograms"""
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def inc(self, name, value=1):
+        """Add value to the counter name"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """Record one duration in the latency histogram of stage name"""
+        if not self.enabled:
+            return
+        index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = {
+                    'buckets': [0] * (len(LATENCY_BUCKETS) + 1), 'sum': 0.0, 'count': 0
+                }
+            histogram['buckets'][index] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+    def span(self, name):
+        """Context manager timing its body as stage name"""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, name)
+
+    def timed(self, name):
+        """Decorator timing every call of the wrapped function as stage name"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """Copy of the current counters and histograms as plain dicts"""
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': {
+                    name: {'buckets': list(h['buckets']), 'sum': h['sum'], 'count': h['count']}
+                    for name, h in self.histograms.items()
+                },
+                'bucket_bounds': list(LATENCY_BUCKETS),
+            }
+
+    def to_prometheus(self, prefix='credit_risk'):
+        """Render the metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = f'{prefix}_{_metric_name(name)}_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric} {value}')
+
+        metric = f'{prefix}_stage_duration_seconds'
+        if snapshot['histograms']:
+            lines.append(f'# TYPE {metric} histogram')
+        for name, histogram in sorted(snapshot['histograms'].items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), histogram['buckets']):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {histogram["sum"]}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path):
+        """Append a timestamped snapshot to a JSON-lines log file"""
+        record = {'timestamp': time.time(), **self.snapshot()}
+        with open(path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def start_json_log(self, path, interval=60.0):
+        """Append a snapshot to path every interval seconds from a daemon thread"""
+        def _log():
+            while True:
+                time.sleep(interval)
+                self.write_json(path)
+        thread = threading.Thread(target=_log, name='metrics-json-log', daemon=True)
+        thread.start()
+        return thread
+
+def _metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+# Shared registry used by the scoring code
+metrics = MetricsRegistry(enabled=os.environ.get('CREDIT_RISK_METRICS', '0') not in ('', '0'))
@@ -1,9 +1,21 @@
+import argparse
+import io
+import json
 import pandas as pd
 import numpy as np
-import joblib
 import os
+import pickle
 import sys
-from preprocessing import DataPreprocessor, load_and_preprocess_data
+import threading
+import time
+from collections import deque
+from metrics import metrics
+import drift
+from artifact_bundle import BUNDLE_NAME, shared_bundle, write_bundle
+from numpy_inference import get_scorer, scorer_arrays
+from result_cache import applicant_cache, canonical_key
+from preprocessing import (DataPreprocessor, QuantileSketch, iter_training_chunks,
+                           load_and_preprocess_data, preprocess_batch, preprocess_input, preprocess_row)
 
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
@@ -15,32 +27,79 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
+# Per-object files written by earlier versions, still loaded when no bundle exists
+LEGACY_ARTIFACT_FILES = ('risk_model.joblib', 'interest_model.joblib', 'preprocessor.joblib')
+
+# Files read by load_models; any change to them changes the artifact version
+ARTIFACT_FILES = (BUNDLE_NAME,) + LEGACY_ARTIFACT_FILES
+
+def artifact_version(models_dir='models'):
+    """Return (mtime, size) of each model artifact on disk, used to detect changed models"""
+    signature = []
+    for name in ARTIFACT_FILES:
+        try:
+            stat = os.stat(os.path.join(models_dir, name))
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+def _holdout_mask(index, test_size):
+    """Deterministically assign rows to the holdout set from their row number"""
+    # Multiplicative hash so the split does not follow the file's ordering
+    hashed = (np.asarray(index, dtype=np.uint64) * np.uint64(2654435761)) % np.uint64(2 ** 32)
+    return hashed < np.uint64(test_size * 2 ** 32)
+
 class CreditRiskModel:
-    def __init__(self):
+    def __init__(self, models_dir='models', sparse_output=False, dtype=np.float64, cache_dir='data_cache'):
         self.risk_model = None
         self.interest_model = None
-        self.preprocessor = DataPreprocessor()
-        self.models_dir = 'models'
+        # sparse_output/dtype only apply to newly trained models; load_models
+        # restores whatever layout the saved preprocessor was trained with
+        self.preprocessor = DataPreprocessor(sparse_output=sparse_output, dtype=dtype)
+        self.models_dir = models_dir
+        # Single versioned, checksummed artifact holding both models and the preprocessor
+        self.bundle_path = os.path.join(self.models_dir, BUNDLE_NAME)
         self.risk_model_path = os.path.join(self.models_dir, 'risk_model.joblib')
         self.interest_model_path = os.path.join(self.models_dir, 'interest_model.joblib')
         self.preprocessor_path = os.path.join(self.models_dir, 'preprocessor.joblib')
-        
-        # Create models directory if it doesn't exist
-        os.makedirs(self.models_dir, exist_ok=True)
+        # Binary cache of the parsed training data; None always re-parses the CSV
+        self.cache_dir = cache_dir
     
-    def load_models(self):
-        """Load pre-trained models and preprocessor"""
-        if os.path.exists(self.risk_model_path) and \
-           os.path.exists(self.interest_model_path) and \
-           os.path.exists(self.preprocessor_path):
+    @metrics.timed('load_models')
+    def load_models(self, train_if_missing=False):
+        """Load pre-trained models and preprocessor
+        
+        Reads the artifact bundle, or the per-object joblib files written by
+        earlier versions. Raises FileNotFoundError if neither exists, unless
+        train_if_missing is set.
+        """
+        bundle = shared_bundle(self.models_dir)
+        if bundle is not None:
+            # The checksum is verified before anything is unpickled
+            _, arrays = bundle
+            self.risk_model, self.interest_model, self.preprocessor = pickle.loads(arrays['objects'])
+        elif os.path.exists(self.risk_model_path) and \
+             os.path.exists(self.interest_model_path) and \
+             os.path.exists(self.preprocessor_path):
+            import joblib
             self.risk_model = joblib.load(self.risk_model_path)
             self.interest_model = joblib.load(self.interest_model_path)
             self.preprocessor = joblib.load(self.preprocessor_path)
-        else:
+        elif train_if_missing:
             self.train_models()
+        else:
+            raise FileNotFoundError(
+                f"No trained models in {os.path.abspath(self.models_dir)}; run 'python model.py train' first"
+            )
     
-    def train_models(self, data_path=None):
-        """Train models from scratch"""
+    def train_models(self, data_path=None, search=False, n_jobs=-1, cv=5):
+        """Train models from scratch
+        
+        With search=True, regularization strengths and alternative model
+        families are cross-validated in parallel on n_jobs processes and the
+        best model per target is kept.
+        """
         # Import heavy sklearn submodules only when training is actually invoked,
         # so that PyInstaller does not bundle them for inference-only use.
         from sklearn.linear_model import LogisticRegression, LinearRegression
@@ -50,7 +109,7 @@ class CreditRiskModel:
             data_path = resource_path('credit_risk_dataset.csv')
             
         # Load and preprocess data
-        data = load_and_preprocess_data(data_path)
+        data = load_and_preprocess_data(data_path, cache_dir=self.cache_dir)
         
         # Prepare features and targets
         X = data.drop(['loan_status', 'loan_int_rate'], axis=1, errors='ignore')
@@ -69,18 +128,32 @@ class CreditRiskModel:
         
         # Fit preprocessor on training data
         self.preprocessor.fit(X_train)
+        # Class balance, reused for the class weights of incremental updates
+        self.preprocessor.stats.update_outcomes(y_train_risk)
         
         # Transform training and test data
         X_train_processed = self.preprocessor.transform(X_train)
         X_test_processed = self.preprocessor.transform(X_test)
         
+        sparse_output = getattr(self.preprocessor, 'sparse_output', False)
+        
         # Train risk model (classification)
-        self.risk_model = LogisticRegression(
-            class_weight='balanced',
-            max_iter=1000,
-            random_state=42
-        )
-        self.risk_model.fit(X_train_processed, y_train_risk)
+        if search:
+            from sklearn.model_selection import StratifiedKFold
+            from model_search import risk_candidates, search_models
+            print("Searching risk models:")
+            best_name, self.risk_model, _ = search_models(
+                risk_candidates(sparse_output), X_train_processed, y_train_risk, 'roc_auc',
+                StratifiedKFold(cv, shuffle=True, random_state=42), n_jobs
+            )
+            print(f"Selected risk model: {best_name}")
+        else:
+            self.risk_model = LogisticRegression(
+                class_weight='balanced',
+                max_iter=1000,
+                random_state=42
+            )
+            self.risk_model.fit(X_train_processed, y_train_risk)
         
         # Train interest rate model (regression) if data is available
         if 'loan_int_rate' in data.columns:
@@ -91,8 +164,18 @@ class CreditRiskModel:
             X_interest_train_processed = self.preprocessor.transform(X_interest_train)
             X_interest_test_processed = self.preprocessor.transform(X_interest_test)
             
-            self.interest_model = LinearRegression()
-            self.interest_model.fit(X_interest_train_processed, y_interest_train)
+            if search:
+                from sklearn.model_selection import KFold
+                from model_search import interest_candidates, search_models
+                print("Searching interest rate models:")
+                best_name, self.interest_model, _ = search_models(
+                    interest_candidates(sparse_output), X_interest_train_processed, y_interest_train,
+                    'neg_mean_squared_error', KFold(cv, shuffle=True, random_state=42), n_jobs
+                )
+                print(f"Selected interest rate model: {best_name}")
+            else:
+                self.interest_model = LinearRegression()
+                self.interest_model.fit(X_interest_train_processed, y_interest_train)
             
             # Evaluate interest rate model
             y_pred_interest = self.interest_model.predict(X_interest_test_processed)
@@ -107,12 +190,258 @@ class CreditRiskModel:
         accuracy = accuracy_score(y_test_risk, y_pred_risk)
         print(f"Risk Model - Accuracy: {accuracy:.4f}")
     
-    def save_models(self):
-        """Save trained models and preprocessor"""
-        joblib.dump(self.risk_model, self.risk_model_path)
+    def train_models_streaming(self, data_path=None, chunksize=100_000, epochs=1, test_size=0.2):
+        """Train models from a CSV read in chunks, so memory stays bounded
+        
+        The preprocessor is fitted from running statistics and the models are
+        SGD-based linear models trained with partial_fit. Rows are assigned to
+        the holdout set by a hash of their row number.
+        """
+        from sklearn.linear_model import SGDClassifier, SGDRegressor
+        if data_path is None:
+            data_path = resource_path('credit_risk_dataset.csv')
+        
+        preprocessor = DataPreprocessor(
+            sparse_output=getattr(self.preprocessor, 'sparse_output', False),
+            dtype=getattr(self.preprocessor, 'dtype', np.float64)
+        )
+        
+        # Pass 1: preprocessor statistics, class balance and the interest rate median
+        rate_sketch = QuantileSketch()
+        has_interest_rate = False
+        for chunk in iter_training_chunks(data_path, chunksize):
+            if 'loan_int_rate' in chunk.columns:
+                has_interest_rate = True
+                rate_sketch.update(chunk['loan_int_rate'])
+            train = chunk[~_holdout_mask(chunk.index, test_size)]
+            preprocessor.partial_fit(train)
+            preprocessor.stats.update_outcomes(train['loan_status'])
+        preprocessor.finalize_fit()
+        rate_median = rate_sketch.quantile(0.5)
+        
+        # partial_fit does not support class_weight='balanced', so compute the same weights up front
+        class_weight = preprocessor.stats.class_weight()
+        # Same decaying step size as SGDRegressor; the default 'optimal' schedule
+        # takes very large first steps on this feature scale
+        risk_model = SGDClassifier(
+            loss='log_loss',
+            class_weight=class_weight,
+            learning_rate='invscaling',
+            eta0=0.01,
+            random_state=42
+        )
+        interest_model = SGDRegressor(random_state=42) if has_interest_rate else None
+        
+        # Pass 2: stream transformed training chunks into the models
+        for _ in range(epochs):
+            for chunk in iter_training_chunks(data_path, chunksize):
+                train = chunk[~_holdout_mask(chunk.index, test_size)]
+                if len(train) == 0:
+                    continue
+                X_train_processed = preprocessor.transform(train)
+                risk_model.partial_fit(X_train_processed, train['loan_status'], classes=np.array([0, 1]))
+                if interest_model is not None:
+                    interest_model.partial_fit(X_train_processed, train['loan_int_rate'].fillna(rate_median))
+        
+        # Pass 3: evaluate on the holdout rows
+        n_test = n_correct = 0
+        squared_error = 0.0
+        for chunk in iter_training_chunks(data_path, chunksize):
+            test = chunk[_holdout_mask(chunk.index, test_size)]
+            if len(test) == 0:
+                continue
+            X_test_processed = preprocessor.transform(test)
+            n_test += len(test)
+            n_correct += int((risk_model.predict(X_test_processed) == test['loan_status'].to_numpy()).sum())
+            if interest_model is not None:
+                y_interest_test = test['loan_int_rate'].fillna(rate_median).to_numpy()
+                squared_error += float(((interest_model.predict(X_test_processed) - y_interest_test) ** 2).sum())
+        
+        if interest_model is not None:
+            print(f"Interest Rate Model - Mean Squared Error: {squared_error / max(n_test, 1):.4f}")
+        
+        self.preprocessor = preprocessor
+        self.risk_model = risk_model
+        self.interest_model = interest_model
+        self.save_models()
+        
+        print(f"Risk Model - Accuracy: {n_correct / max(n_test, 1):.4f}")
+    
+    def update_models(self, delta_path, max_iter=20):
+        """Fold a file of new loan outcomes into the fitted models without a full retrain
+        
+        The preprocessor's running statistics absorb the delta rows and the
+        persisted coefficients are re-expressed in the updated feature space.
+        The new coefficients then minimize the loss on the delta plus a
+        quadratic penalty toward the old ones that stands in for the loss on
+        the history: its curvature is each feature's second moment over the
+        history, times the number of history rows. Risk class weights are
+        balanced over history plus delta, as in train_models, including the
+        reweighting of the history's rows. A delta therefore moves the models
+        about as much as retraining on history plus delta would, and the cost
+        is proportional to the size of the delta. The risk model is solved with
+        at most max_iter Newton steps, the interest rate model exactly.
+        """
+        if self.risk_model is None or self.preprocessor is None:
+            self.load_models()
+        if not self.has_linear_models():
+            raise ValueError('incremental updates need linear models; retrain with train_models')
+        
+        delta = pd.concat(iter_training_chunks(delta_path), ignore_index=True)
+        X_delta = delta.drop(['loan_status', 'loan_int_rate'], axis=1, errors='ignore')
+        
+        stats = self.preprocessor.stats
+        n_history = float(stats.n_observed[0] + stats.n_missing[0])
+        history_counts = stats._outcome_counts().copy()
+        old_weight = stats.class_weight()
+        old_layout = self._feature_layout()
+        self.preprocessor.update(X_delta)
+        stats.update_outcomes(delta['loan_status'])
+        X_delta_processed = self.preprocessor.transform(X_delta)
+        if hasattr(X_delta_processed, 'toarray'):
+            X_delta_processed = X_delta_processed.toarray()
+        # Intercept as an extra all-ones feature
+        X_delta_processed = np.hstack([X_delta_processed, np.ones((len(delta), 1))])
+        
+        # Second moment of each feature over the history: scaled numerical
+        # features have unit variance, a one-hot feature has its category's frequency
+        second_moments = self.preprocessor.feature_means()
+        second_moments[:len(self.preprocessor.numerical_cols)] = 1.0
+        second_moments = np.append(second_moments, 1.0)
+        
+        y_risk = delta['loan_status'].to_numpy()
+        coef, intercept = self._remap_coefficients(self.risk_model, old_layout)
+        old = np.append(coef, intercept)
+        p = 1 / (1 + np.exp(-(X_delta_processed @ old)))
+        # Logistic loss curvature is p(1 - p) times the features' second moments;
+        # the delta's rows under the old model estimate p(1 - p) on the history
+        curvature = np.mean(p * (1 - p)) * second_moments
+        history_gradient = np.zeros_like(old)
+        if old_weight is None or stats.class_weight() is None:
+            sample_weight = np.ones(len(delta))
+            prior = n_history * curvature
+        else:
+            # Balanced weights follow the class counts, so the history's rows are
+            # reweighted too. At the old optimum the two classes' gradient sums
+            # over the history cancel under the old weights; estimate the
+            # positive class's sum from the delta's rows and apply the new weights
+            new_weight = stats.class_weight()
+            sample_weight = np.where(y_risk == 1, new_weight[1], new_weight[0])
+            prior = (new_weight[0] * history_counts[0] + new_weight[1] * history_counts[1]) * curvature
+            positive = y_risk == 1
+            positive_sum = (
+                history_counts[1] * (X_delta_processed[positive].T @ (p[positive] - 1))
+                - old_weight[0] / old_weight[1] * history_counts[0] * (X_delta_processed[~positive].T @ p[~positive])
+            ) / len(delta)
+            history_gradient = positive_sum * (new_weight[1] - new_weight[0] * old_weight[1] / old_weight[0])
+        theta = old.copy()
+        for _ in range(max_iter):
+            p = 1 / (1 + np.exp(-(X_delta_processed @ theta)))
+            gradient = X_delta_processed.T @ (sample_weight * (p - y_risk)) + history_gradient + prior * (theta - old)
+            hessian = (X_delta_processed.T * (sample_weight * p * (1 - p))) @ X_delta_processed + np.diag(prior)
+            step = np.linalg.solve(hessian, gradient)
+            theta -= step
+            if np.max(np.abs(step)) < 1e-8:
+                break
+        self._set_coefficients(self.risk_model, theta[:-1], theta[-1])
+        
         if self.interest_model is not None:
-            joblib.dump(self.interest_model, self.interest_model_path)
-        joblib.dump(self.preprocessor, self.preprocessor_path)
+            coef, intercept = self._remap_coefficients(self.interest_model, old_layout)
+            old = np.append(coef, intercept)
+            interest_mask = delta['loan_int_rate'].notna().to_numpy() if 'loan_int_rate' in delta.columns \
+                else np.zeros(len(delta), dtype=bool)
+            X_rates = X_delta_processed[interest_mask]
+            residual = delta.loc[interest_mask, 'loan_int_rate'].to_numpy() - X_rates @ old
+            # Squared loss curvature is the features' second moments; with no new rates this keeps old
+            theta = old + np.linalg.solve(X_rates.T @ X_rates + np.diag(n_history * second_moments),
+                                          X_rates.T @ residual)
+            self._set_coefficients(self.interest_model, theta[:-1], theta[-1])
+        
+        self.save_models()
+        print(f"Updated models with {len(delta)} new loan outcomes")
+    
+    @staticmethod
+    def _set_coefficients(estimator, coef, intercept):
+        """Replace the coefficients of a fitted linear estimator, keeping their shapes"""
+        estimator.coef_ = np.reshape(coef, (1, -1)) if np.ndim(estimator.coef_) == 2 else np.asarray(coef)
+        estimator.intercept_ = np.reshape(intercept, np.shape(estimator.intercept_))
+        estimator.n_features_in_ = len(coef)
+    
+    def _feature_layout(self):
+        """Scaler statistics and one-hot column keys of the current preprocessor"""
+        encoder = self.preprocessor.encoder
+        return {
+            'mean': self.preprocessor.scaler.mean_.copy(),
+            'scale': self.preprocessor.scaler.scale_.copy(),
+            'categories': [
+                (col, category)
+                for col, categories in zip(self.preprocessor.categorical_cols, encoder.categories_)
+                for category in categories
+            ],
+        }
+    
+    def _remap_coefficients(self, estimator, old_layout):
+        """Coefficients of estimator rewritten for the current feature layout
+        
+        Numerical weights and the intercept are adjusted so predictions are
+        unchanged under the new scaler statistics; one-hot weights are matched
+        by category and new categories start at zero.
+        """
+        new_layout = self._feature_layout()
+        coef = np.ravel(estimator.coef_)
+        intercept = float(np.ravel(estimator.intercept_)[0])
+        n_numeric = len(self.preprocessor.numerical_cols)
+        
+        numeric = coef[:n_numeric]
+        new_numeric = numeric * new_layout['scale'] / old_layout['scale']
+        intercept += float(np.sum(numeric * (new_layout['mean'] - old_layout['mean']) / old_layout['scale']))
+        
+        old_index = {key: i for i, key in enumerate(old_layout['categories'])}
+        new_categorical = np.array([
+            coef[n_numeric + old_index[key]] if key in old_index else 0.0
+            for key in new_layout['categories']
+        ])
+        return np.concatenate([new_numeric, new_categorical]), intercept
+    
+    def save_models(self):
+        """Save trained models and preprocessor as one artifact bundle
+        
+        For linear models the bundle also holds the flattened arrays read by
+        numpy_inference.NumpyScorer. The bundle replaces the previous one in a
+        single rename, so readers see either the old models or the new ones.
+        """
+        import sklearn
+        # Create models directory if it doesn't exist
+        os.makedirs(self.models_dir, exist_ok=True)
+        
+        linear = self.has_linear_models()
+        arrays = scorer_arrays(self) if linear else {}
+        # Training-data baseline for drift monitoring of scored traffic
+        arrays.update(drift.baseline_arrays(self.preprocessor))
+        objects = pickle.dumps((self.risk_model, self.interest_model, self.preprocessor),
+                               protocol=pickle.HIGHEST_PROTOCOL)
+        arrays['objects'] = np.frombuffer(objects, dtype=np.uint8)
+        write_bundle(self.bundle_path, arrays, metadata={
+            'created': time.time(),
+            'risk_model': type(self.risk_model).__name__,
+            'interest_model': type(self.interest_model).__name__ if self.interest_model is not None else None,
+            'linear': linear,
+            'sklearn_version': sklearn.__version__,
+        })
+        
+        # Files from the per-object layout would be stale next to the new bundle
+        for name in LEGACY_ARTIFACT_FILES + ('scorer.npz',):
+            path = os.path.join(self.models_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+        
+        # Cached per-applicant results belong to the previous artifacts
+        applicant_cache.clear()
+    
+    def has_linear_models(self):
+        """Whether both models are linear, i.e. expose coef_ on the preprocessed features"""
+        return hasattr(self.risk_model, 'coef_') and \
+            (self.interest_model is None or hasattr(self.interest_model, 'coef_'))
     
     def predict_risk(self, input_data):
         """Predict probability of default (0-1)"""
@@ -123,7 +452,9 @@ class CreditRiskModel:
         processed_input = self.preprocessor.transform(input_data)
         
         # Predict probability of default (class 1)
-        risk_prob = self.risk_model.predict_proba(processed_input)[0][1]
+        with metrics.span('predict_proba'):
+            risk_prob = self.risk_model.predict_proba(processed_input)[0][1]
+        metrics.inc('rows_scored')
         return risk_prob
     
     def predict_interest_rate(self, input_data):
@@ -135,10 +466,357 @@ class CreditRiskModel:
         processed_input = self.preprocessor.transform(input_data)
         
         # Predict interest rate
-        interest_rate = self.interest_model.predict(processed_input)[0]
+        with metrics.span('predict'):
+            interest_rate = self.interest_model.predict(processed_input)[0]
         return max(0, interest_rate)  # Ensure non-negative interest rate
 
-if __name__ == "__main__":
-    # Train models if this script is run directly
+    def predict_batch(self, data):
+        """Predict default probabilities and interest rates for many rows at once
+
+        Takes a DataFrame with the training feature columns (e.g. the output of
+        preprocess_input or rows of the training CSV) and returns two aligned
+        arrays: probability of default and predicted interest rate.
+        """
+        if self.risk_model is None or self.interest_model is None or self.preprocessor is None:
+            self.load_models()
+        
+        # Preprocess the whole batch in one vectorized pass
+        return self._predict_transformed(self.preprocessor.transform(data))
+
+    def _predict_transformed(self, processed_data):
+        with metrics.span('predict_proba'):
+            risk_probs = self.risk_model.predict_proba(processed_data)[:, 1]
+        with metrics.span('predict'):
+            interest_rates = np.maximum(self.interest_model.predict(processed_data), 0)
+        metrics.inc('rows_scored', len(risk_probs))
+        return risk_probs, interest_rates
+
+    def predict_all(self, input_data):
+        """Predict probability of default and interest rate with a single transform"""
+        risk_probs, interest_rates = self.predict_batch(input_data)
+        return risk_probs[0], interest_rates[0]
+
+    def explain_batch(self, data, top_k=None):
+        """Per-column contributions to the default log-odds of a batch of applicants
+        
+        A column's contribution is coef * (x - training mean) summed over the
+        features derived from it, so each row's contributions plus base_logit,
+        the log-odds of the average training applicant, equal the row's
+        log-odds. The whole batch is explained with one matrix product.
+        
+        Returns (columns, contributions, base_logit), where contributions has
+        one row per applicant and one column per entry of columns. With top_k,
+        only the top_k contributions of largest magnitude are kept per row,
+        largest first, and columns becomes an array of the same shape naming
+        the column behind each one.
+        """
+        if self.risk_model is None or self.preprocessor is None:
+            self.load_models()
+        self._check_explainable()
+        return self._explain_transformed(self.preprocessor.transform(data), top_k)
+
+    def predict_and_explain(self, data, top_k=None):
+        """predict_batch and explain_batch of the same rows with a single transform
+        
+        Returns (risk_probs, interest_rates, columns, contributions, base_logit).
+        """
+        if self.risk_model is None or self.interest_model is None or self.preprocessor is None:
+            self.load_models()
+        self._check_explainable()
+        
+        X = self.preprocessor.transform(data)
+        risk_probs, interest_rates = self._predict_transformed(X)
+        return (risk_probs, interest_rates) + self._explain_transformed(X, top_k)
+
+    def _check_explainable(self):
+        if not hasattr(self.risk_model, 'coef_'):
+            raise ValueError('explanations need a linear risk model; retrain with train_models')
+
+    def _explain_transformed(self, X, top_k):
+        preprocessor = self.preprocessor
+        columns = preprocessor.numerical_cols + preprocessor.categorical_cols
+        # Weight matrix folding every feature's coefficient into its input column
+        coef = np.ravel(self.risk_model.coef_)
+        feature_column = [columns.index(col) for col in preprocessor.feature_columns()]
+        weights = np.zeros((len(coef), len(columns)))
+        weights[np.arange(len(coef)), feature_column] = coef
+        offsets = preprocessor.feature_means() @ weights
+        base_logit = float(np.ravel(self.risk_model.intercept_)[0] + offsets.sum())
+        
+        with metrics.span('explain'):
+            contributions = np.asarray(X @ weights) - offsets
+        
+        if top_k is None:
+            return columns, contributions, base_logit
+        
+        # Unordered top_k per row in linear time, then sort only those
+        top_k = min(top_k, len(columns))
+        top = np.argpartition(-np.abs(contributions), top_k - 1, axis=1)[:, :top_k]
+        top_values = np.take_along_axis(contributions, top, axis=1)
+        order = np.argsort(-np.abs(top_values), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return np.array(columns)[top], np.take_along_axis(top_values, order, axis=1), base_logit
+
+# Process-wide registry of loaded models, keyed by absolute models directory
+_model_registry = {}
+_model_registry_lock = threading.Lock()
+
+def get_model(models_dir='models'):
+    """Return a shared, loaded CreditRiskModel for models_dir
+    
+    Artifacts are deserialized once per process and reloaded only when the
+    files on disk change. Safe to call from concurrent Streamlit sessions.
+    """
+    key = os.path.abspath(models_dir)
+    # Read the signature before loading: if the artifacts change mid-load, the
+    # stored signature is stale and the next call reloads
+    signature = artifact_version(models_dir)
+    with _model_registry_lock:
+        entry = _model_registry.get(key)
+        if entry is not None and entry[0] == signature:
+            metrics.inc('model_cache_hits')
+            return entry[1]
+        
+        metrics.inc('model_cache_misses')
+        model = CreditRiskModel(models_dir)
+        model.load_models()
+        _model_registry[key] = (signature, model)
+        return model
+
+def applicant_cache_key(input_data, models_dir='models'):
+    """Key of input_data's result in applicant_cache, which changes whenever the models on disk do"""
+    return (os.path.abspath(models_dir), artifact_version(models_dir), canonical_key(input_data))
+
+def score_applicant(input_data, models_dir='models', use_cache=True):
+    """Score one applicant dict, returning (probability of default, interest rate)
+    
+    Uses the exported NumPy scorer when it exists, so scikit-learn is never
+    imported on the serving path, and falls back to the scikit-learn models otherwise.
+    Results are memoized in applicant_cache, keyed on the applicant's fields and
+    the artifact version, so re-submitting identical fields skips scoring; cache
+    hits are still recorded for drift monitoring.
+    """
+    if use_cache:
+        key = applicant_cache_key(input_data, models_dir)
+        result = applicant_cache.get(key)
+        if result is not None:
+            drift.record_applicant(input_data, models_dir)
+            return result
+    
+    scorer = get_scorer(models_dir)
+    if scorer is not None:
+        columns = preprocess_row(input_data)
+        risk_probs, interest_rates = scorer.predict_batch(columns)
+        result = (risk_probs[0], interest_rates[0])
+    else:
+        columns = preprocess_input(input_data)
+        result = get_model(models_dir).predict_all(columns)
+    drift.record(columns, models_dir)
+    
+    if use_cache:
+        applicant_cache.put(key, result)
+    return result
+
+def score_batch(applicants, models_dir='models'):
+    """Score a list of applicant dicts with one vectorized call
+    
+    Returns aligned arrays of default probabilities and interest rates.
+    """
+    # Prefer the NumPy scorer; fall back to the scikit-learn models if they are not linear
+    model = get_scorer(models_dir) or get_model(models_dir)
+    columns = preprocess_batch(applicants)
+    result = model.predict_batch(columns)
+    # Only batches that scored are recorded, so a failed batch retried item by item counts once
+    drift.record(columns, models_dir)
+    return result
+
+# Scorer, optional drift monitor and input file set up once per scoring worker process by _init_score_worker
+_worker_scorer = None
+_worker_monitor = None
+_worker_input = None
+
+def _peak_rss_mb():
+    """Peak resident memory of the current process in MB, or None if unavailable"""
+    try:
+        import resource
+    except ImportError:  # Not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def _init_score_worker(models_dir, input_path, columns, track_drift=False):
+    global _worker_scorer, _worker_monitor, _worker_input
+    # The memory-mapped NumPy scorer is shared by all workers through the page cache
+    _worker_scorer = get_scorer(models_dir)
+    if _worker_scorer is None:
+        _worker_scorer = CreditRiskModel(models_dir)
+        _worker_scorer.load_models()
+    if track_drift:
+        _worker_monitor = drift.new_monitor(models_dir)
+    _worker_input = (input_path, columns)
+
+def _line_ranges(path, target_bytes):
+    """Yield (start, end) byte ranges of whole lines after the header, each about target_bytes long"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + target_bytes, size))
+            f.readline()  # Move on to the start of the next line
+            end = f.tell()
+            yield start, end
+            start = end
+
+def _score_range(start, end):
+    """Parse, score and format one byte range of the input inside a worker process
+    
+    Returns the range's output rows as CSV text, so the parent only has to
+    write them out in order.
+    """
+    input_path, columns = _worker_input
+    with open(input_path, 'rb') as f:
+        f.seek(start)
+        raw = f.read(end - start)
+    if not raw.strip():
+        return '', 0, os.getpid(), _peak_rss_mb(), None
+    chunk = pd.read_csv(io.BytesIO(raw), header=None, names=columns)
+    
+    batch = preprocess_batch(chunk)
+    risk_probs, interest_rates = _worker_scorer.predict_batch(batch)
+    # Return this range's drift counts only, so the parent can sum them without double counting
+    drift_counts = None
+    if _worker_monitor is not None:
+        _worker_monitor.update(batch)
+        drift_counts = _worker_monitor.counts_snapshot()
+        _worker_monitor.reset()
+    
+    text = chunk.assign(
+        predicted_default_probability=risk_probs,
+        predicted_interest_rate=interest_rates
+    ).to_csv(header=False, index=False)
+    return text, len(chunk), os.getpid(), _peak_rss_mb(), drift_counts
+
+def score_file(input_path, output_path, models_dir='models', workers=None, chunksize=100_000,
+               drift_report=None):
+    """Score an applicant CSV with a pool of worker processes
+    
+    The file is split into byte ranges of about chunksize rows at line
+    boundaries, without parsing it. Each worker reads, scores and formats its
+    own ranges, and the parent writes the returned CSV text to output_path in
+    input order, with the predictions appended as two extra columns. Only a
+    bounded number of ranges is in flight at once, so memory does not grow
+    with file size. Fields must not contain quoted line breaks.
+    With drift_report, the file's drift from the training data is written
+    there as JSON.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    if not any(artifact_version(models_dir)):
+        raise FileNotFoundError(
+            f"No trained models in {os.path.abspath(models_dir)}; run 'python model.py train' first"
+        )
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    n_rows = 0
+    worker_memory = {}
+    pending = deque()
+    monitor = None
+    if drift_report:
+        monitor = drift.new_monitor(models_dir)
+        if monitor is None:
+            print("No drift baseline in these models; retrain them to enable drift reports")
+    
+    # Size the byte ranges from the average length of the first rows
+    columns = list(pd.read_csv(input_path, nrows=0).columns)
+    with open(input_path, 'rb') as f:
+        f.readline()
+        sample = f.read(1 << 16)
+    row_bytes = len(sample) / max(sample.count(b'\n'), 1)
+    target_bytes = max(int(chunksize * row_bytes), 1)
+    
+    with ProcessPoolExecutor(workers, initializer=_init_score_worker,
+                             initargs=(models_dir, input_path, columns, monitor is not None)) as pool, \
+         open(output_path, 'w', newline='') as output:
+        output.write(pd.DataFrame(columns=columns + ['predicted_default_probability',
+                                                     'predicted_interest_rate']).to_csv(index=False))
+        
+        def write_oldest():
+            nonlocal n_rows
+            text, rows, pid, peak_rss, drift_counts = pending.popleft().result()
+            if monitor is not None and drift_counts is not None:
+                monitor.add_counts(drift_counts)
+            output.write(text)
+            n_rows += rows
+            worker_memory[pid] = peak_rss
+        
+        for range_start, range_end in _line_ranges(input_path, target_bytes):
+            pending.append(pool.submit(_score_range, range_start, range_end))
+            if len(pending) >= 2 * workers:
+                write_oldest()
+        while pending:
+            write_oldest()
+    
+    elapsed = time.perf_counter() - start
+    print(f"Scored {n_rows} rows in {elapsed:.2f}s ({n_rows / elapsed:,.0f} rows/sec) with {workers} workers")
+    for pid, peak_rss in sorted(worker_memory.items()):
+        memory = f"{peak_rss:.0f} MB" if peak_rss is not None else "unavailable"
+        print(f"  worker {pid}: peak memory {memory}")
+    
+    if monitor is not None:
+        report = monitor.report()
+        with open(drift_report, 'w') as f:
+            json.dump(report, f, indent=2)
+        drifted = [col for col, summary in report['columns'].items() if summary['psi'] > drift.PSI_ALERT_THRESHOLD]
+        print(f"Drift report written to {drift_report}; "
+              f"PSI > {drift.PSI_ALERT_THRESHOLD} for: {', '.join(drifted) or 'none'}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the credit risk models or score an applicant file')
+    subparsers = parser.add_subparsers(dest='command')
+    
+    train_parser = subparsers.add_parser('train', help='train the models (default when no command is given)')
+    train_parser.add_argument('--data', default=None, help='training CSV (defaults to credit_risk_dataset.csv)')
+    train_parser.add_argument('--stream', action='store_true', help='train from chunks with bounded memory')
+    train_parser.add_argument('--chunksize', type=int, default=100_000)
+    train_parser.add_argument('--search', action='store_true',
+                              help='cross-validate several model families in parallel and keep the best')
+    train_parser.add_argument('--jobs', type=int, default=-1, help='worker processes for --search')
+    train_parser.add_argument('--cv', type=int, default=5, help='cross-validation folds for --search')
+    
+    update_parser = subparsers.add_parser('update', help='fold a file of new loan outcomes into the saved models')
+    update_parser.add_argument('delta', help='CSV of new loan outcomes with the training columns')
+    update_parser.add_argument('--max-iter', type=int, default=20, help='Newton steps for the risk model')
+    
+    score_parser = subparsers.add_parser('score', help='score an applicant CSV in parallel')
+    score_parser.add_argument('input', help='applicant CSV with the same fields as the prediction form')
+    score_parser.add_argument('output', help='where to write the input rows with predictions')
+    score_parser.add_argument('--workers', type=int, default=None, help='worker processes (defaults to CPU count)')
+    score_parser.add_argument('--chunksize', type=int, default=100_000)
+    score_parser.add_argument('--models-dir', default='models')
+    score_parser.add_argument('--drift-report', default=None,
+                              help='write PSI/KS drift of the file against the training data to this JSON file')
+    
+    args = parser.parse_args()
+    if args.command == 'score':
+        score_file(args.input, args.output, args.models_dir, args.workers, args.chunksize, args.drift_report)
+        return
+    
     model = CreditRiskModel()
-    model.train_models()
+    if args.command == 'update':
+        model.update_models(args.delta, args.max_iter)
+        return
+    
+    # Train models if this script is run directly
+    if getattr(args, 'stream', False):
+        model.train_models_streaming(args.data, chunksize=args.chunksize)
+    elif getattr(args, 'search', False):
+        model.train_models(args.data, search=True, n_jobs=args.jobs, cv=args.cv)
+    else:
+        model.train_models(getattr(args, 'data', None))
+
+if __name__ == "__main__":
+    # Needed for the scoring process pool in frozen (PyInstaller) builds
+    from multiprocessing import freeze_support
+    freeze_support()
+    main()
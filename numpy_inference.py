@@ -0,0 +1,146 @@
+"""
+Pure-NumPy inference for the credit risk models.
+
+scorer_arrays flattens a trained CreditRiskModel (imputer medians, scaler
+statistics, encoder categories and linear model coefficients) into plain
+arrays, which save_models stores in the model's artifact bundle. NumpyScorer
+scores rows from those arrays with plain NumPy, so serving does not need to
+import pandas or scikit-learn.
+"""
+import numpy as np
+from artifact_bundle import shared_object
+from metrics import metrics
+
+def scorer_arrays(model):
+    """Flatten the fitted preprocessing and linear model parameters of model into arrays"""
+    preprocessor = model.preprocessor
+    if not model.has_linear_models():
+        raise ValueError('only linear models can be exported to a NumPy scorer')
+
+    n_numeric = len(preprocessor.numerical_cols)
+    risk_coef = np.ravel(model.risk_model.coef_)
+    has_interest_model = model.interest_model is not None
+    if has_interest_model:
+        interest_coef = np.ravel(model.interest_model.coef_)
+        interest_intercept = float(np.ravel(model.interest_model.intercept_)[0])
+    else:
+        interest_coef = np.zeros_like(risk_coef)
+        interest_intercept = np.nan
+
+    arrays = {
+        'numerical_cols': np.array(preprocessor.numerical_cols),
+        'categorical_cols': np.array(preprocessor.categorical_cols),
+        'medians': preprocessor.imputer.statistics_.astype(np.float64),
+        'mean': preprocessor.scaler.mean_.astype(np.float64),
+        'scale': preprocessor.scaler.scale_.astype(np.float64),
+        'risk_numeric': risk_coef[:n_numeric],
+        'risk_intercept': np.array(float(np.ravel(model.risk_model.intercept_)[0])),
+        'interest_numeric': interest_coef[:n_numeric],
+        'interest_intercept': np.array(interest_intercept),
+    }
+
+    # One block of weights per categorical column, sorted by category so that
+    # lookups can use np.searchsorted
+    offset = n_numeric
+    for i, categories in enumerate(preprocessor.encoder.categories_):
+        names = np.array([str(category) for category in categories])
+        order = np.argsort(names)
+        block = slice(offset, offset + len(names))
+        arrays[f'categories_{i}'] = names[order]
+        arrays[f'risk_weights_{i}'] = risk_coef[block][order]
+        arrays[f'interest_weights_{i}'] = interest_coef[block][order]
+        offset += len(names)
+    return arrays
+
+class NumpyScorer:
+    """Scores applicants from the arrays produced by scorer_arrays"""
+    def __init__(self, arrays):
+        self.numerical_cols = arrays['numerical_cols'].tolist()
+        self.categorical_cols = arrays['categorical_cols'].tolist()
+        self.medians = arrays['medians']
+        self.mean = arrays['mean']
+        self.scale = arrays['scale']
+        self.risk_numeric = arrays['risk_numeric']
+        self.risk_intercept = float(arrays['risk_intercept'])
+        self.interest_numeric = arrays['interest_numeric']
+        self.interest_intercept = float(arrays['interest_intercept'])
+        self.categories = [arrays[f'categories_{i}'] for i in range(len(self.categorical_cols))]
+        self.risk_weights = [arrays[f'risk_weights_{i}'] for i in range(len(self.categorical_cols))]
+        self.interest_weights = [arrays[f'interest_weights_{i}'] for i in range(len(self.categorical_cols))]
+
+    @classmethod
+    def from_bundle(cls, manifest, arrays):
+        """Build a scorer from a bundle's manifest and arrays, or return None if its models are not linear
+
+        The arrays are used as they are, so a scorer built from a memory-mapped
+        bundle shares its pages with every other process mapping it.
+        """
+        if not manifest['metadata'].get('linear'):
+            return None
+        return cls(arrays)
+
+    @metrics.timed('numpy_scorer')
+    def predict_batch(self, columns):
+        """Predict default probabilities and interest rates
+
+        columns maps each feature column name to a sequence of values, e.g. a
+        DataFrame or a dict of lists. Returns two aligned arrays, matching
+        CreditRiskModel.predict_batch.
+        """
+        # Median imputation and standard scaling of the numerical columns
+        numeric = np.column_stack([np.asarray(columns[col], dtype=np.float64) for col in self.numerical_cols])
+        scaled = self._scale(numeric, slice(None))
+
+        risk_logit = scaled @ self.risk_numeric + self.risk_intercept
+        interest_rates = scaled @ self.interest_numeric + self.interest_intercept
+
+        for i, col in enumerate(self.categorical_cols):
+            risk_logit += self._category_terms(i, columns[col], self.risk_weights[i])
+            interest_rates += self._category_terms(i, columns[col], self.interest_weights[i])
+
+        risk_probs = sigmoid(risk_logit)
+        metrics.inc('rows_scored', len(risk_probs))
+        return risk_probs, np.maximum(interest_rates, 0)
+
+    def column_terms(self, col, values):
+        """Contribution of one input column to the risk log-odds and to the interest rate
+
+        values may have any shape; returns two arrays of that shape. Summing the
+        terms of every column plus the intercepts gives the model outputs.
+        """
+        if col in self.numerical_cols:
+            j = self.numerical_cols.index(col)
+            scaled = self._scale(np.asarray(values, dtype=np.float64), j)
+            return scaled * self.risk_numeric[j], scaled * self.interest_numeric[j]
+        i = self.categorical_cols.index(col)
+        return (self._category_terms(i, values, self.risk_weights[i]),
+                self._category_terms(i, values, self.interest_weights[i]))
+
+    def _scale(self, values, j):
+        # Median imputation followed by standard scaling of numerical column(s) j
+        values = np.where(np.isnan(values), self.medians[j], values)
+        # Reject what is left non-finite (e.g. loan_percent_income with zero
+        # income), as the scikit-learn imputer does
+        if not np.isfinite(values).all():
+            raise ValueError("Input X contains infinity or a value too large for dtype('float64').")
+        return (values - self.mean[j]) / self.scale[j]
+
+    def _category_terms(self, i, values, weights):
+        # One-hot terms are a weight lookup; unknown categories contribute nothing
+        categories = self.categories[i]
+        values = np.asarray(values).astype(str)
+        index = np.minimum(np.searchsorted(categories, values), len(categories) - 1)
+        known = categories[index] == values
+        return np.where(known, weights[index], 0.0)
+
+def sigmoid(logit):
+    """Logistic function written with tanh so large logits do not overflow"""
+    return 0.5 * (1.0 + np.tanh(0.5 * logit))
+
+def get_scorer(models_dir='models'):
+    """Return a shared NumpyScorer for models_dir, or None if it has no linear model bundle
+
+    The scorer is built once per process from artifact_bundle.shared_bundle
+    and rebuilt only when the bundle changes on disk.
+    """
+    return shared_object(models_dir, 'scorer', NumpyScorer.from_bundle)
@@ -1,16 +1,198 @@
+import hashlib
+import json
+import os
+import shutil
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.impute import SimpleImputer
+from metrics import metrics
+
+# Declared dtypes for the training CSV, so every chunk parses the same way and
+# the categorical columns are held as compact pandas categories
+TRAINING_DTYPES = {
+    'person_age': 'float64',
+    'person_income': 'float64',
+    'person_home_ownership': 'category',
+    'person_emp_length': 'float64',
+    'loan_intent': 'category',
+    'loan_grade': 'category',
+    'loan_amnt': 'float64',
+    'loan_int_rate': 'float64',
+    'loan_status': 'int8',
+    'loan_percent_income': 'float64',
+    'cb_person_default_on_file': 'category',
+    'cb_person_cred_hist_length': 'float64',
+}
+
+NUMERICAL_COLS = ['person_age', 'person_income', 'person_emp_length',
+                  'loan_amnt', 'loan_percent_income', 'cb_person_cred_hist_length']
+CATEGORICAL_COLS = ['person_home_ownership', 'loan_intent', 'loan_grade', 'cb_person_default_on_file']
+
+# Columns produced by preprocess_input, in order
+REQUIRED_COLS = ['person_age', 'person_income', 'person_home_ownership',
+                 'person_emp_length', 'loan_intent', 'loan_grade',
+                 'loan_amnt', 'loan_percent_income', 'cb_person_cred_hist_length',
+                 'cb_person_default_on_file']
+
+# Bump when the derived features or the cached column layout change
+DATA_CACHE_VERSION = 1
+
+class QuantileSketch:
+    """Mergeable quantile sketch over values rounded to a few significant digits
+    
+    Keeps one count per distinct rounded value, so memory is bounded by the
+    number of representable values rather than the number of rows, and two
+    sketches merge by adding their counts.
+    """
+    def __init__(self, significant_digits=4):
+        self.significant_digits = significant_digits
+        self.counts = {}
+        self.count = 0
+    
+    def update(self, values):
+        """Add an array of values, ignoring NaN and infinite entries"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+        
+        # Round each value to the configured number of significant digits
+        magnitude = np.floor(np.log10(np.abs(np.where(values == 0, 1, values))))
+        factor = 10.0 ** (self.significant_digits - 1 - magnitude)
+        rounded = np.round(values * factor) / factor
+        
+        keys, counts = np.unique(rounded, return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.count += int(counts.sum())
+        return self
+    
+    def merge(self, other):
+        """Fold another sketch's counts into this one"""
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.count += other.count
+        return self
+    
+    def quantile(self, q):
+        """Return the q-th quantile, interpolated the same way as np.quantile"""
+        if self.count == 0:
+            return np.nan
+        keys = np.array(sorted(self.counts))
+        cumulative = np.cumsum([self.counts[key] for key in keys])
+        position = q * (self.count - 1)
+        lower = keys[np.searchsorted(cumulative, np.floor(position), side='right')]
+        upper = keys[np.searchsorted(cumulative, np.ceil(position), side='right')]
+        return lower + (upper - lower) * (position - np.floor(position))
+
+class FeatureStats:
+    """Running statistics over the preprocessor's input columns
+    
+    For every numerical column this tracks a quantile sketch, the missing count
+    and the mean/variance of the observed values; for every categorical column
+    it tracks category counts. Outcome counts of loan_status are added through
+    update_outcomes. Memory does not grow with the number of rows.
+    """
+    def __init__(self, numerical_cols, categorical_cols):
+        self.numerical_cols = list(numerical_cols)
+        self.categorical_cols = list(categorical_cols)
+        self.sketches = {col: QuantileSketch() for col in self.numerical_cols}
+        self.n_observed = np.zeros(len(self.numerical_cols))
+        self.n_missing = np.zeros(len(self.numerical_cols))
+        self.mean = np.zeros(len(self.numerical_cols))
+        self.m2 = np.zeros(len(self.numerical_cols))
+        self.category_counts = {col: {} for col in self.categorical_cols}
+        self.outcome_counts = np.zeros(2)
+    
+    def update(self, data):
+        """Fold a chunk of rows into the running statistics"""
+        values = data[self.numerical_cols].to_numpy(dtype=np.float64)
+        observed = ~np.isnan(values)
+        n_chunk = observed.sum(axis=0)
+        
+        for i, col in enumerate(self.numerical_cols):
+            self.sketches[col].update(values[observed[:, i], i])
+        
+        chunk_mean = np.where(observed, values, 0).sum(axis=0) / np.maximum(n_chunk, 1)
+        chunk_m2 = (np.where(observed, values - chunk_mean, 0) ** 2).sum(axis=0)
+        self._merge_moments(n_chunk, chunk_mean, chunk_m2)
+        self.n_missing += len(values) - n_chunk
+        
+        for col in self.categorical_cols:
+            self._merge_counts(col, data[col].value_counts().items())
+        return self
+    
+    def merge(self, other):
+        """Fold another FeatureStats over the same columns into this one"""
+        for col in self.numerical_cols:
+            self.sketches[col].merge(other.sketches[col])
+        self._merge_moments(other.n_observed, other.mean, other.m2)
+        self.n_missing += other.n_missing
+        for col in self.categorical_cols:
+            self._merge_counts(col, other.category_counts[col].items())
+        self.outcome_counts = self._outcome_counts() + other._outcome_counts()
+        return self
+    
+    def update_outcomes(self, loan_status):
+        """Fold a chunk of loan_status values into the running class counts"""
+        counts = np.bincount(np.asarray(loan_status, dtype=np.int64), minlength=2)
+        self.outcome_counts = self._outcome_counts() + counts
+        return self
+    
+    def _outcome_counts(self):
+        # Statistics pickled before outcome counts were tracked have none
+        return getattr(self, 'outcome_counts', np.zeros(2))
+    
+    def class_weight(self):
+        """'balanced' class weights from the outcome counts, or None until both classes are seen"""
+        counts = self._outcome_counts()
+        if not counts.all():
+            return None
+        return {label: counts.sum() / (2 * count) for label, count in enumerate(counts)}
+    
+    def _merge_moments(self, n_other, mean_other, m2_other):
+        # Chan et al. pairwise update of count, mean and sum of squared deviations
+        total = self.n_observed + n_other
+        safe_total = np.maximum(total, 1)
+        delta = mean_other - self.mean
+        self.mean = self.mean + delta * n_other / safe_total
+        self.m2 = self.m2 + m2_other + delta ** 2 * self.n_observed * n_other / safe_total
+        self.n_observed = total
+    
+    def _merge_counts(self, col, items):
+        counts = self.category_counts[col]
+        for category, count in items:
+            if count > 0:  # value_counts on a category column lists unused categories too
+                counts[category] = counts.get(category, 0) + int(count)
+    
+    def medians(self):
+        """Approximate median of the observed values of each numerical column"""
+        return np.array([self.sketches[col].quantile(0.5) for col in self.numerical_cols])
+    
+    def imputed_moments(self, fill_values):
+        """Mean and variance each column would have with missing values set to fill_values"""
+        n_total = np.maximum(self.n_observed + self.n_missing, 1)
+        mean = (self.n_observed * self.mean + self.n_missing * fill_values) / n_total
+        m2 = self.m2 + (self.mean - fill_values) ** 2 * self.n_observed * self.n_missing / n_total
+        return mean, m2 / n_total
+    
+    def categories(self):
+        """Sorted list of the categories seen in each categorical column"""
+        return {col: sorted(counts) for col, counts in self.category_counts.items()}
 
 class DataPreprocessor:
-    def __init__(self):
+    def __init__(self, sparse_output=False, dtype=np.float64):
+        # sparse_output keeps the feature matrix in CSR form instead of densifying
+        # the one-hot block; dtype controls the precision of the feature matrix
+        self.sparse_output = sparse_output
+        self.dtype = dtype
+        # Imported here so that scoring through the NumPy scorer never loads scikit-learn
+        from sklearn.preprocessing import StandardScaler, OneHotEncoder
+        from sklearn.impute import SimpleImputer
         self.scaler = StandardScaler()
-        self.encoder = OneHotEncoder(handle_unknown='ignore')
+        self.encoder = OneHotEncoder(handle_unknown='ignore', dtype=dtype)
         self.imputer = SimpleImputer(strategy='median')
-        self.categorical_cols = ['person_home_ownership', 'loan_intent', 'loan_grade', 'cb_person_default_on_file']
-        self.numerical_cols = ['person_age', 'person_income', 'person_emp_length', 
-                              'loan_amnt', 'loan_percent_income', 'cb_person_cred_hist_length']
+        self.categorical_cols = list(CATEGORICAL_COLS)
+        self.numerical_cols = list(NUMERICAL_COLS)
         
     def fit(self, data):
         """Fit the preprocessor on training data"""
@@ -24,68 +206,280 @@ class DataPreprocessor:
         # Fit encoder on categorical columns
         self.encoder.fit(data[self.categorical_cols])
         
+        # Keep mergeable running statistics so the fit can be updated incrementally
+        self.stats = FeatureStats(self.numerical_cols, self.categorical_cols).update(data)
+    
+    def partial_fit(self, data):
+        """Accumulate running statistics from a chunk of training data
+        
+        Call finalize_fit once every chunk has been seen to fit the imputer,
+        scaler and encoder from the accumulated statistics.
+        """
+        if getattr(self, 'stats', None) is None:
+            self.stats = FeatureStats(self.numerical_cols, self.categorical_cols)
+        self.stats.update(data)
+        return self
+    
+    def update(self, data):
+        """Fold new training rows into the fitted statistics and refit from them"""
+        if getattr(self, 'stats', None) is None:
+            raise ValueError('preprocessor has no running statistics; refit it from scratch with fit()')
+        self.partial_fit(data)
+        return self.finalize_fit()
+    
+    def finalize_fit(self):
+        """Fit the imputer, scaler and encoder from the statistics gathered by partial_fit"""
+        # A single row holding the medians gives the imputer exactly those statistics
+        medians = self.stats.medians()
+        self.imputer.fit(pd.DataFrame([medians], columns=self.numerical_cols))
+        
+        # Two rows at mean -/+ std reproduce the moments of the median-imputed data
+        mean, var = self.stats.imputed_moments(medians)
+        std = np.sqrt(var)
+        self.scaler.fit(np.vstack([mean - std, mean + std]))
+        
+        # Fit the encoder on every category seen, padding columns to a common length
+        categories = self.stats.categories()
+        width = max(len(values) for values in categories.values())
+        self.encoder.fit(pd.DataFrame({
+            col: values + values[-1:] * (width - len(values))
+            for col, values in categories.items()
+        }))
+        return self
+        
+    @metrics.timed('transform')
     def transform(self, data):
         """Transform the input data"""
+        # Preprocessors pickled before these options existed are dense float64
+        sparse_output = getattr(self, 'sparse_output', False)
+        dtype = getattr(self, 'dtype', np.float64)
+        
         # Handle missing values
         numeric_data = self.imputer.transform(data[self.numerical_cols])
         
         # Scale numerical features
-        scaled_numeric = self.scaler.transform(numeric_data)
+        scaled_numeric = self.scaler.transform(numeric_data).astype(dtype, copy=False)
         
-        # Encode categorical features and convert to dense array if needed
+        # Encode categorical features
         encoded_cats = self.encoder.transform(data[self.categorical_cols])
+        
+        if sparse_output:
+            # Keep the one-hot block sparse and return a CSR matrix
+            from scipy import sparse
+            return sparse.hstack(
+                [sparse.csr_matrix(scaled_numeric), encoded_cats], format='csr', dtype=dtype
+            )
+        
         if hasattr(encoded_cats, 'toarray'):  # If sparse, convert to dense
             encoded_cats = encoded_cats.toarray()
         
         # Combine features
-        processed_data = np.hstack([scaled_numeric, encoded_cats])
+        processed_data = np.hstack([scaled_numeric, encoded_cats]).astype(dtype, copy=False)
         
         return processed_data
+    
+    def feature_columns(self):
+        """Input column that each column of transform's output was derived from"""
+        columns = list(self.numerical_cols)
+        for col, categories in zip(self.categorical_cols, self.encoder.categories_):
+            columns += [col] * len(categories)
+        return columns
+    
+    def feature_means(self):
+        """Mean of each column of transform's output over the training data
+        
+        Scaled numerical features have mean 0 and each one-hot feature has its
+        category's training frequency. Preprocessors pickled before running
+        statistics were recorded report 0 for the one-hot features too.
+        """
+        means = [np.zeros(len(self.numerical_cols))]
+        stats = getattr(self, 'stats', None)
+        for col, categories in zip(self.categorical_cols, self.encoder.categories_):
+            counts = stats.category_counts[col] if stats is not None else {}
+            frequencies = np.array([counts.get(category, 0) for category in categories], dtype=np.float64)
+            means.append(frequencies / max(sum(counts.values()), 1))
+        return np.concatenate(means)
 
+@metrics.timed('preprocess_input')
 def preprocess_input(input_data):
     """Preprocess single input for prediction"""
-    # Convert input to DataFrame with same structure as training data
-    input_df = pd.DataFrame([input_data])
-    
-    # Calculate derived features if needed
-    if 'loan_amnt' in input_df.columns and 'person_income' in input_df.columns:
-        input_df['loan_percent_income'] = input_df['loan_amnt'] / input_df['person_income']
-    
-    # Set default loan grade (can be predicted or set to most common)
-    if 'loan_grade' not in input_df.columns:
-        input_df['loan_grade'] = 'B'  # Default to most common grade
-    
-    # Ensure all required columns are present
-    required_cols = ['person_age', 'person_income', 'person_home_ownership', 
-                    'person_emp_length', 'loan_intent', 'loan_grade', 
-                    'loan_amnt', 'loan_percent_income', 'cb_person_cred_hist_length', 
-                    'cb_person_default_on_file']
-    
-    for col in required_cols:
-        if col not in input_df.columns:
-            if col == 'loan_percent_income':
-                input_df[col] = input_df['loan_amnt'] / input_df['person_income']
-            elif col == 'loan_grade':
-                input_df[col] = 'B'  # Default value
-            else:
-                input_df[col] = 0  # Default value for other columns
-    
-    return input_df[required_cols]
-
-def load_and_preprocess_data(filepath):
-    """Load and preprocess the training data"""
+    return preprocess_batch([input_data])
+
+def _input_default(col):
+    # Default to the most common loan grade; other missing fields default to 0
+    return 'B' if col == 'loan_grade' else 0
+
+@metrics.timed('preprocess_batch')
+def preprocess_batch(records):
+    """Preprocess many inputs for prediction in one columnar pass
+    
+    records can be a list of dicts, a NumPy record/structured array or a
+    DataFrame. Fields missing from a dict get the same defaults as
+    preprocess_input, per record, so a row's result never depends on the
+    other rows in the batch; for arrays and DataFrames, columns missing from
+    the input entirely get those defaults. loan_percent_income is derived
+    from loan_amnt and person_income whenever both are given.
+    """
+    if isinstance(records, (list, tuple)) and all(isinstance(record, dict) for record in records):
+        return _preprocess_records(records)
+    
+    data = records if isinstance(records, pd.DataFrame) else pd.DataFrame(records)
+    n_rows = len(data)
+    
+    columns = {}
+    for col in REQUIRED_COLS:
+        if col in data.columns:
+            columns[col] = data[col].to_numpy()
+        elif col != 'loan_percent_income':
+            columns[col] = np.full(n_rows, _input_default(col))
+    
+    if 'loan_percent_income' not in data.columns or \
+            ('loan_amnt' in data.columns and 'person_income' in data.columns):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns['loan_percent_income'] = (
+                np.asarray(columns['loan_amnt'], dtype=np.float64) /
+                np.asarray(columns['person_income'], dtype=np.float64)
+            )
+    
+    return pd.DataFrame({col: columns[col] for col in REQUIRED_COLS}, copy=False)
+
+def _preprocess_records(records):
+    """preprocess_batch for a list of dicts, applying preprocess_row's rules to each record"""
+    columns = {
+        col: [record.get(col, _input_default(col)) for record in records]
+        for col in REQUIRED_COLS if col != 'loan_percent_income'
+    }
+    
+    # A record keeps its own loan_percent_income only if it cannot be derived from its fields
+    given = np.array([
+        'loan_percent_income' in record and not ('loan_amnt' in record and 'person_income' in record)
+        for record in records
+    ], dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        derived = np.asarray(columns['loan_amnt'], dtype=np.float64) / \
+            np.asarray(columns['person_income'], dtype=np.float64)
+    if given.any():
+        supplied = np.array([record.get('loan_percent_income', np.nan) for record in records], dtype=np.float64)
+        derived = np.where(given, supplied, derived)
+    columns['loan_percent_income'] = derived
+    
+    return pd.DataFrame({col: columns[col] for col in REQUIRED_COLS}, copy=False)
+
+def preprocess_row(input_data):
+    """Fast path of preprocess_input for one row that does not touch pandas
+    
+    Returns a dict mapping each required column to a one-element list, which
+    NumpyScorer.predict_batch accepts directly.
+    """
+    row = {col: input_data.get(col, _input_default(col)) for col in REQUIRED_COLS}
+    if 'loan_percent_income' not in input_data or \
+            ('loan_amnt' in input_data and 'person_income' in input_data):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            row['loan_percent_income'] = np.float64(row['loan_amnt']) / np.float64(row['person_income'])
+    return {col: [value] for col, value in row.items()}
+
+def _data_cache_key(filepath):
+    """Hash of the source file's contents and the loader configuration"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    config = {'version': DATA_CACHE_VERSION, 'dtypes': TRAINING_DTYPES}
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+def _write_data_cache(data, cache_path):
+    """Write each column as a .npy file plus a meta.json, then move it into place"""
+    tmp_path = f'{cache_path}.tmp-{os.getpid()}'
+    os.makedirs(tmp_path, exist_ok=True)
+    columns = []
+    for i, col in enumerate(data.columns):
+        entry = {'name': col, 'file': f'{i}.npy'}
+        if pd.api.types.is_numeric_dtype(data[col]):
+            values = data[col].to_numpy()
+        else:
+            # Store non-numeric columns as integer codes with a category table
+            categorical = data[col].astype('category')
+            entry['categories'] = categorical.cat.categories.tolist()
+            values = categorical.cat.codes.to_numpy()
+        np.save(os.path.join(tmp_path, entry['file']), values)
+        columns.append(entry)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump({'n_rows': len(data), 'columns': columns}, f)
+    
+    try:
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # Another process wrote the same cache entry first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+def _prune_data_cache(cache_dir, keep):
+    """Remove every cache entry in cache_dir except keep, so the cache holds one dataset copy"""
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        # Leave other processes' in-progress writes and anything that is not an entry alone
+        if name == keep or '.tmp-' in name or not os.path.exists(os.path.join(path, 'meta.json')):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+
+def _read_data_cache(cache_path):
+    """Load a cache written by _write_data_cache, memory-mapping every column"""
+    with open(os.path.join(cache_path, 'meta.json')) as f:
+        meta = json.load(f)
+    columns = {}
+    for entry in meta['columns']:
+        values = np.load(os.path.join(cache_path, entry['file']), mmap_mode='r')
+        if 'categories' in entry:
+            columns[entry['name']] = pd.Categorical.from_codes(values, entry['categories'])
+        else:
+            columns[entry['name']] = values
+    return pd.DataFrame(columns, copy=False)
+
+def load_and_preprocess_data(filepath, cache_dir=None):
+    """Load and preprocess the training data
+    
+    If cache_dir is given, the typed and derived dataset is cached there as
+    memory-mapped .npy columns, keyed by a hash of the source file, and later
+    calls load the cache instead of parsing the CSV. Writing a new entry
+    removes the older ones, so a source file that changes between runs does
+    not leave a full copy of every earlier version behind.
+    """
+    if cache_dir is not None:
+        cache_key = _data_cache_key(filepath)
+        cache_path = os.path.join(cache_dir, cache_key)
+        if os.path.exists(os.path.join(cache_path, 'meta.json')):
+            return _read_data_cache(cache_path)
+    
     # Load data
-    data = pd.read_csv(filepath)
+    data = pd.read_csv(filepath, dtype=TRAINING_DTYPES)
     
     # Calculate derived features
     data['loan_percent_income'] = data['loan_amnt'] / data['person_income']
     
     # Handle missing values in loan_int_rate (if needed for training)
     if 'loan_int_rate' in data.columns:
-        data['loan_int_rate'].fillna(data['loan_int_rate'].median(), inplace=True)
+        data['loan_int_rate'] = data['loan_int_rate'].fillna(data['loan_int_rate'].median())
     
     # Handle missing employment length
     if 'person_emp_length' in data.columns:
-        data['person_emp_length'].fillna(0, inplace=True)
+        data['person_emp_length'] = data['person_emp_length'].fillna(0)
+    
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_data_cache(data, cache_path)
+        _prune_data_cache(cache_dir, cache_key)
     
     return data
+
+def iter_training_chunks(filepath, chunksize=100_000):
+    """Yield the training data in chunks of at most chunksize rows
+    
+    Applies the same dtypes, derived features and employment length fill as
+    load_and_preprocess_data. The loan_int_rate median fill needs the whole
+    file, so it is left to the caller.
+    """
+    for chunk in pd.read_csv(filepath, dtype=TRAINING_DTYPES, chunksize=chunksize):
+        chunk['loan_percent_income'] = chunk['loan_amnt'] / chunk['person_income']
+        if 'person_emp_length' in chunk.columns:
+            chunk['person_emp_length'] = chunk['person_emp_length'].fillna(0)
+        yield chunk
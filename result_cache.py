@@ -0,0 +1,89 @@
+"""
+Bounded memoization of per-applicant scoring results.
+
+ResultCache is a thread-safe LRU cache whose entries also expire after a TTL.
+model.score_applicant keys it on the canonicalized applicant dict and the
+on-disk artifact version, and save_models clears it, so results never outlive
+the models that produced them.
+"""
+import numbers
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import metrics
+
+class ResultCache:
+    """Thread-safe LRU cache with per-entry time-to-live"""
+    def __init__(self, maxsize=1024, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, maxsize=None, ttl=None):
+        """Change the size bound and/or TTL, evicting entries beyond the new size"""
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached value for key, or None if it is missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.inc('result_cache_hits')
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+        metrics.inc('result_cache_misses')
+        return None
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entry if full"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counts, hit rate and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+            }
+
+def canonical_key(input_data):
+    """Hashable key for an applicant dict that ignores key order and int/float differences"""
+    items = []
+    for name, value in sorted(input_data.items()):
+        if isinstance(value, numbers.Real) and not isinstance(value, bool):
+            value = float(value)
+        items.append((name, value))
+    return tuple(items)
+
+# Shared cache used by model.score_applicant
+applicant_cache = ResultCache()
@@ -0,0 +1,157 @@
+"""
+Portfolio what-if analysis over a grid of feature values.
+
+Both models are linear in the preprocessed features, so each applicant's
+score is an intercept plus one term per input column. ScenarioEngine computes
+the terms of every column the grid does not touch once per applicant, and the
+terms of each grid value once per value. Every grid cell is then a broadcast
+addition instead of a full preprocess-and-predict. Results are streamed to
+.npy files on disk, one row per cell and one column per applicant, so grids
+with hundreds of millions of cells never have to fit in memory.
+
+    python scenarios.py applicants.csv what_if/ --grid loan_amnt=5000,10000,20000 --grid loan_grade=A,B,C
+"""
+import argparse
+import json
+import os
+import numpy as np
+
+from numpy_inference import NumpyScorer, scorer_arrays, sigmoid
+from preprocessing import REQUIRED_COLS, preprocess_batch
+
+class ScenarioEngine:
+    """Scores every applicant under every combination of grid values"""
+    def __init__(self, scorer):
+        self.scorer = scorer
+
+    @classmethod
+    def from_model(cls, model):
+        """Build an engine from a trained CreditRiskModel with linear models"""
+        return cls(NumpyScorer(scorer_arrays(model)))
+
+    def run(self, applicants, grid, output_dir, block_elements=1 << 22):
+        """Score applicants under every cell of grid and write the results to output_dir
+
+        applicants is anything preprocess_batch accepts. grid maps input
+        columns to the values to try; cells enumerate the combinations in
+        row-major order of the grid's columns. Writes default_probability.npy
+        and interest_rate.npy (float32, shape (n_cells, n_applicants)) plus a
+        grid.json describing the cells, and returns the output paths.
+        """
+        scorer = self.scorer
+        data = preprocess_batch(applicants)
+        n_applicants = len(data)
+
+        grid_cols = list(grid)
+        for col in grid_cols:
+            if col not in REQUIRED_COLS or col == 'loan_percent_income':
+                raise ValueError(f'cannot vary {col!r}; choose from the applicant input fields')
+        grid_values = [np.asarray(grid[col]) for col in grid_cols]
+        shape = tuple(len(values) for values in grid_values)
+        n_cells = int(np.prod(shape))
+
+        # loan_percent_income is derived, so it changes whenever loan_amnt or income does
+        derived_varies = 'loan_amnt' in grid or 'person_income' in grid
+        varying = set(grid_cols) | ({'loan_percent_income'} if derived_varies else set())
+
+        # Per-applicant base scores from every column the grid leaves unchanged
+        base_risk = np.full(n_applicants, scorer.risk_intercept)
+        base_interest = np.full(n_applicants, scorer.interest_intercept)
+        for col in scorer.numerical_cols + scorer.categorical_cols:
+            if col not in varying:
+                risk_terms, interest_terms = scorer.column_terms(col, data[col].to_numpy())
+                base_risk += risk_terms
+                base_interest += interest_terms
+
+        # Terms of each grid value, computed once per value rather than once per cell
+        value_terms = [scorer.column_terms(col, values) for col, values in zip(grid_cols, grid_values)]
+
+        # A cell pairing zero income with a non-zero amount has an infinite
+        # loan_percent_income, which scoring rejects; fail before writing any output
+        if derived_varies:
+            incomes = np.asarray(grid.get('person_income', data['person_income']), dtype=np.float64)
+            amounts = np.asarray(grid.get('loan_amnt', data['loan_amnt']), dtype=np.float64)
+            if np.any(incomes == 0) and np.any((amounts != 0) & ~np.isnan(amounts)):
+                raise ValueError('loan_percent_income is infinite for cells with zero person_income')
+
+        os.makedirs(output_dir, exist_ok=True)
+        paths = {
+            'default_probability': os.path.join(output_dir, 'default_probability.npy'),
+            'interest_rate': os.path.join(output_dir, 'interest_rate.npy'),
+            'grid': os.path.join(output_dir, 'grid.json'),
+        }
+        risk_out = np.lib.format.open_memmap(paths['default_probability'], mode='w+',
+                                             dtype=np.float32, shape=(n_cells, n_applicants))
+        interest_out = np.lib.format.open_memmap(paths['interest_rate'], mode='w+',
+                                                 dtype=np.float32, shape=(n_cells, n_applicants))
+
+        # Process cells in blocks so each block holds about block_elements scores
+        block_cells = max(1, block_elements // max(n_applicants, 1))
+        for start in range(0, n_cells, block_cells):
+            stop = min(start + block_cells, n_cells)
+            cell_index = np.unravel_index(np.arange(start, stop), shape)
+            cell_risk = sum(terms[0][index] for terms, index in zip(value_terms, cell_index))
+            cell_interest = sum(terms[1][index] for terms, index in zip(value_terms, cell_index))
+            risk_logit = base_risk[None, :] + np.reshape(cell_risk, (-1, 1))
+            interest_rates = base_interest[None, :] + np.reshape(cell_interest, (-1, 1))
+
+            if derived_varies:
+                amount = self._cell_or_applicant('loan_amnt', grid_cols, grid_values, cell_index, data)
+                income = self._cell_or_applicant('person_income', grid_cols, grid_values, cell_index, data)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    risk_terms, interest_terms = scorer.column_terms('loan_percent_income', amount / income)
+                risk_logit = risk_logit + risk_terms
+                interest_rates = interest_rates + interest_terms
+
+            risk_out[start:stop] = sigmoid(risk_logit)
+            interest_out[start:stop] = np.maximum(interest_rates, 0)
+
+        risk_out.flush()
+        interest_out.flush()
+        del risk_out, interest_out
+
+        with open(paths['grid'], 'w') as f:
+            json.dump({
+                'columns': grid_cols,
+                'values': [values.tolist() for values in grid_values],
+                'shape': list(shape),
+                'n_applicants': n_applicants,
+            }, f)
+        return paths
+
+    @staticmethod
+    def _cell_or_applicant(col, grid_cols, grid_values, cell_index, data):
+        # Grid value per cell as a column vector, or the applicants' own values as a row vector
+        if col in grid_cols:
+            i = grid_cols.index(col)
+            return grid_values[i].astype(np.float64)[cell_index[i]][:, None]
+        return data[col].to_numpy(dtype=np.float64)[None, :]
+
+def _parse_grid_value(text):
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+def main():
+    parser = argparse.ArgumentParser(description='Score an applicant portfolio over a grid of what-if values')
+    parser.add_argument('applicants', help='applicant CSV with the same fields as the prediction form')
+    parser.add_argument('output_dir')
+    parser.add_argument('--grid', action='append', required=True, metavar='COLUMN=V1,V2,...',
+                        help='values to try for one column; repeat for each column in the grid')
+    parser.add_argument('--models-dir', default='models')
+    args = parser.parse_args()
+
+    import pandas as pd
+    from model import get_model
+    grid = {}
+    for spec in args.grid:
+        col, _, values = spec.partition('=')
+        grid[col] = [_parse_grid_value(value) for value in values.split(',')]
+
+    engine = ScenarioEngine.from_model(get_model(args.models_dir))
+    paths = engine.run(pd.read_csv(args.applicants), grid, args.output_dir)
+    print(f"Wrote {paths['default_probability']} and {paths['interest_rate']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Headless HTTP/JSON scoring service for the credit risk models.
+
+Routes:
+    GET  /health         -> {"status": "ok"}
+    GET  /metrics        -> scoring metrics in the Prometheus text format
+    GET  /drift          -> drift of scored applicants from the training data (with --drift)
+    POST /predict        -> one applicant object in, one prediction out
+    POST /predict/batch  -> {"applicants": [...]} in, {"predictions": [...]} out
+"""
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import drift
+from metrics import metrics
+from model import get_model, score_applicant, score_batch
+from numpy_inference import get_scorer
+
+def score_applicants(applicants, models_dir='models'):
+    """Score a list of applicant dicts and return one prediction dict per applicant"""
+    risk_probs, interest_rates = score_batch(applicants, models_dir)
+    return [
+        {'default_probability': float(risk_prob), 'interest_rate': float(interest_rate)}
+        for risk_prob, interest_rate in zip(risk_probs, interest_rates)
+    ]
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps client connections alive between requests
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without TCP_NODELAY each response
+    # waits on the client's delayed ACK
+    disable_nagle_algorithm = True
+    models_dir = 'models'
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        elif self.path == '/metrics':
+            self._send(200, metrics.to_prometheus().encode(), 'text/plain; version=0.0.4')
+        elif self.path == '/drift':
+            monitor = drift.get_monitor(self.models_dir) if drift.monitoring_enabled else None
+            if monitor is None:
+                self._send_json(404, {'error': 'drift monitoring is off or the models have no baseline'})
+            else:
+                self._send_json(200, monitor.report())
+        else:
+            self._send_json(404, {'error': f'unknown route {self.path}'})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'null')
+        except ValueError:
+            self._send_json(400, {'error': 'request body must be valid JSON'})
+            return
+
+        try:
+            if self.path == '/predict':
+                if not isinstance(payload, dict):
+                    raise ValueError('expected a JSON object describing one applicant')
+                risk_prob, interest_rate = score_applicant(payload, self.models_dir)
+                self._send_json(200, {'default_probability': float(risk_prob), 'interest_rate': float(interest_rate)})
+            elif self.path == '/predict/batch':
+                applicants = payload.get('applicants') if isinstance(payload, dict) else None
+                if not isinstance(applicants, list) or not applicants:
+                    raise ValueError('expected {"applicants": [...]} with at least one applicant')
+                if not all(isinstance(applicant, dict) for applicant in applicants):
+                    raise ValueError('expected every applicant to be a JSON object')
+                self._send_json(200, {'predictions': score_applicants(applicants, self.models_dir)})
+            else:
+                self._send_json(404, {'error': f'unknown route {self.path}'})
+        except FileNotFoundError as e:
+            # No trained models in models_dir
+            self._send_json(503, {'error': str(e)})
+        except (KeyError, TypeError, ValueError) as e:
+            self._send_json(400, {'error': str(e)})
+
+    def _send_json(self, status, body):
+        self._send(status, json.dumps(body).encode(), 'application/json')
+
+    def _send(self, status, data, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Per-request access logging to stderr is a measurable cost on the hot path
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the headless credit risk scoring service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--models-dir', default='models')
+    parser.add_argument('--metrics', action='store_true', help='collect timing metrics, served on /metrics')
+    parser.add_argument('--metrics-log', default=None, help='also append metric snapshots to this JSON-lines file')
+    parser.add_argument('--metrics-interval', type=float, default=60.0, help='seconds between --metrics-log snapshots')
+    parser.add_argument('--drift', action='store_true',
+                        help='track drift of scored applicants from the training data at /drift')
+    args = parser.parse_args()
+
+    if args.drift:
+        drift.enable_monitoring()
+    if args.metrics or args.metrics_log:
+        metrics.enable()
+    if args.metrics_log:
+        metrics.start_json_log(args.metrics_log, args.metrics_interval)
+
+    ScoringRequestHandler.models_dir = args.models_dir
+    # Load the models before accepting traffic so the first request is not slow
+    if get_scorer(args.models_dir) is None:
+        get_model(args.models_dir)
+
+    server = ThreadingHTTPServer((args.host, args.port), ScoringRequestHandler)
+    server.daemon_threads = True
+    print(f"Scoring service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
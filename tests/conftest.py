@@ -0,0 +1,39 @@
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+# The modules under test live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import make_synthetic_applicants
+from model import CreditRiskModel
+
+@pytest.fixture(scope='session')
+def history():
+    return make_synthetic_applicants(4000, seed=1)
+
+@pytest.fixture(scope='session')
+def applicants():
+    """Feature rows without missing values, so imputation cannot affect comparisons"""
+    data = make_synthetic_applicants(500, seed=3).dropna()
+    return data.drop(columns=['loan_status', 'loan_int_rate']).reset_index(drop=True)
+
+@pytest.fixture(scope='session')
+def trained_models_dir(tmp_path_factory, history):
+    """A models directory trained once per session on the synthetic history"""
+    directory = tmp_path_factory.mktemp('models')
+    data_path = directory / 'history.csv'
+    history.to_csv(data_path, index=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        CreditRiskModel(str(directory), cache_dir=None).train_models(str(data_path))
+    return str(directory)
+
+@pytest.fixture
+def model(trained_models_dir):
+    """A freshly loaded copy of the trained models, safe to modify"""
+    model = CreditRiskModel(trained_models_dir)
+    model.load_models()
+    return model
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from artifact_bundle import read_bundle, write_bundle
+
+def _write(tmp_path):
+    path = tmp_path / 'test.bundle'
+    arrays = {'weights': np.arange(12, dtype=np.float64).reshape(3, 4), 'scalar': np.array(2.5)}
+    write_bundle(str(path), arrays, metadata={'linear': True})
+    return path, arrays
+
+def test_round_trip(tmp_path):
+    path, arrays = _write(tmp_path)
+    manifest, loaded = read_bundle(str(path))
+    assert manifest['metadata'] == {'linear': True}
+    for name, value in arrays.items():
+        np.testing.assert_array_equal(loaded[name], value)
+        assert loaded[name].shape == value.shape
+        assert not loaded[name].flags.writeable
+
+def test_corrupt_payload_is_rejected(tmp_path):
+    path, _ = _write(tmp_path)
+    raw = bytearray(path.read_bytes())
+    raw[-1] ^= 0xFF
+    path.write_bytes(bytes(raw))
+    with pytest.raises(ValueError, match='corrupt'):
+        read_bundle(str(path))
+    # Skipping verification reads the damaged payload as is
+    read_bundle(str(path), verify=False)
+
+def test_truncated_bundle_is_rejected(tmp_path):
+    path, _ = _write(tmp_path)
+    path.write_bytes(path.read_bytes()[:-8])
+    with pytest.raises(ValueError, match='truncated'):
+        read_bundle(str(path))
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / 'model.joblib'
+    path.write_bytes(b'not a bundle at all')
+    with pytest.raises(ValueError, match='not a model bundle'):
+        read_bundle(str(path))
+
+def test_object_arrays_cannot_be_written(tmp_path):
+    with pytest.raises(ValueError, match='dtype object'):
+        write_bundle(str(tmp_path / 'test.bundle'), {'names': np.array(['a', None], dtype=object)})
@@ -0,0 +1,38 @@
+import pytest
+
+from batching import MicroBatcher
+
+def _double(items):
+    if any(item < 0 for item in items):
+        raise ValueError('negative item')
+    return [item * 2 for item in items]
+
+def test_batches_score_every_item():
+    batcher = MicroBatcher(_double, max_wait_ms=20)
+    futures = [batcher.submit(item) for item in range(10)]
+    assert [future.result(timeout=5) for future in futures] == [item * 2 for item in range(10)]
+
+def test_a_bad_item_only_fails_its_own_caller():
+    batcher = MicroBatcher(_double, max_wait_ms=50)
+    good, bad = batcher.submit(1), batcher.submit(-1)
+    assert good.result(timeout=5) == 2
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+
+def test_cancelled_requests_do_not_stop_the_batcher():
+    batcher = MicroBatcher(_double, max_wait_ms=50)
+    cancelled = batcher.submit(1)
+    assert cancelled.cancel()
+    kept = batcher.submit(2)
+    assert kept.result(timeout=5) == 4
+    # The scoring thread is still running for later requests
+    assert batcher.submit(3).result(timeout=5) == 6
+
+def test_a_failing_batch_does_not_stop_the_batcher():
+    def broken(items):
+        return None  # Not a list of results
+    batcher = MicroBatcher(broken, max_wait_ms=1)
+    with pytest.raises(TypeError):
+        batcher.submit(1).result(timeout=5)
+    batcher.score_fn = _double
+    assert batcher.submit(2).result(timeout=5) == 4
@@ -0,0 +1,31 @@
+import pytest
+
+import drift
+from batching import MicroBatcher
+from benchmark import APPLICANT
+from model import score_applicant, score_batch
+
+@pytest.fixture
+def monitoring(monkeypatch):
+    monkeypatch.setattr(drift, 'monitoring_enabled', True)
+
+def test_only_scored_rows_are_recorded(monitoring, trained_models_dir):
+    monitor = drift.get_monitor(trained_models_dir)
+    monitor.reset()
+    batcher = MicroBatcher(lambda applicants: list(zip(*score_batch(applicants, trained_models_dir))),
+                           max_wait_ms=50)
+    futures = [batcher.submit(APPLICANT) for _ in range(5)]
+    futures.append(batcher.submit({**APPLICANT, 'person_income': 0}))
+    for future in futures[:5]:
+        future.result(timeout=10)
+    with pytest.raises(ValueError):
+        futures[5].result(timeout=10)
+    assert monitor.report()['rows'] == 5
+
+def test_cache_hits_are_recorded(monitoring, trained_models_dir):
+    monitor = drift.get_monitor(trained_models_dir)
+    monitor.reset()
+    applicant = {**APPLICANT, 'person_age': 41}
+    for _ in range(3):
+        score_applicant(applicant, trained_models_dir)
+    assert monitor.report()['rows'] == 3
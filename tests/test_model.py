@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+def test_remap_coefficients_keeps_predictions(model, applicants, history):
+    before = model.predict_batch(applicants)
+
+    # New rows shift the scaler statistics and bring an unseen category
+    old_layout = model._feature_layout()
+    new_rows = history.drop(columns=['loan_status', 'loan_int_rate']).sample(500, random_state=0)
+    new_rows['person_income'] *= 3
+    new_rows.iloc[0, new_rows.columns.get_loc('person_home_ownership')] = 'SHARED'
+    model.preprocessor.update(new_rows)
+    for estimator in (model.risk_model, model.interest_model):
+        coef, intercept = model._remap_coefficients(estimator, old_layout)
+        model._set_coefficients(estimator, coef, intercept)
+
+    after = model.predict_batch(applicants)
+    np.testing.assert_allclose(after[0], before[0], rtol=1e-9)
+    np.testing.assert_allclose(after[1], before[1], rtol=1e-9)
+    assert 'SHARED' in model.preprocessor.encoder.categories_[0]
+
+def test_predict_and_explain_matches_separate_calls(model, applicants):
+    risk, interest, columns, contributions, base_logit = model.predict_and_explain(applicants)
+    expected_risk, expected_interest = model.predict_batch(applicants)
+    np.testing.assert_allclose(risk, expected_risk)
+    np.testing.assert_allclose(interest, expected_interest)
+    # Contributions plus the base log-odds reproduce each row's log-odds
+    np.testing.assert_allclose(1 / (1 + np.exp(-(contributions.sum(axis=1) + base_logit))), risk)
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from numpy_inference import NumpyScorer, scorer_arrays
+from preprocessing import preprocess_batch
+
+def test_scorer_matches_sklearn_models(model, applicants):
+    scorer = NumpyScorer(scorer_arrays(model))
+    data = preprocess_batch(applicants)
+    risk, interest = scorer.predict_batch(data)
+    expected_risk, expected_interest = model.predict_batch(data)
+    np.testing.assert_allclose(risk, expected_risk, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(interest, expected_interest, rtol=1e-9, atol=1e-12)
+
+def test_scorer_handles_missing_and_unknown_values(model, applicants):
+    scorer = NumpyScorer(scorer_arrays(model))
+    data = applicants.head(20).copy()
+    data.loc[0, 'person_emp_length'] = np.nan
+    data.loc[1, 'loan_intent'] = 'NOT_A_CATEGORY'
+    data = preprocess_batch(data)
+    risk, interest = scorer.predict_batch(data)
+    expected_risk, expected_interest = model.predict_batch(data)
+    np.testing.assert_allclose(risk, expected_risk, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(interest, expected_interest, rtol=1e-9, atol=1e-12)
+
+def test_scorer_rejects_infinite_features(model, applicants):
+    scorer = NumpyScorer(scorer_arrays(model))
+    data = applicants.head(2).assign(person_income=[0.0, 50000.0])
+    with pytest.raises(ValueError, match='infinity'):
+        scorer.predict_batch(preprocess_batch(data))
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import APPLICANT
+from preprocessing import QuantileSketch, preprocess_batch, preprocess_input, preprocess_row
+
+def _without(record, *keys):
+    return {key: value for key, value in record.items() if key not in keys}
+
+# Records that leave out different fields, so defaults filled per column
+# rather than per record would make them disagree
+MIXED_RECORDS = [
+    APPLICANT,
+    {**APPLICANT, 'loan_grade': 'A', 'person_emp_length': 12},
+    _without(APPLICANT, 'person_emp_length'),
+    {**_without(APPLICANT, 'person_income'), 'loan_percent_income': 0.3},
+    {**APPLICANT, 'loan_percent_income': 0.9},
+]
+
+def test_preprocess_batch_matches_preprocess_input():
+    batch = preprocess_batch(MIXED_RECORDS)
+    single = pd.concat([preprocess_input(record) for record in MIXED_RECORDS], ignore_index=True)
+    pd.testing.assert_frame_equal(batch, single, check_dtype=False)
+
+def test_preprocess_row_matches_preprocess_input():
+    for record in MIXED_RECORDS:
+        row = pd.DataFrame(preprocess_row(record))
+        pd.testing.assert_frame_equal(row, preprocess_input(record), check_dtype=False)
+
+def test_batch_and_single_row_scores_agree(model):
+    batch = np.column_stack(model.predict_batch(preprocess_batch(MIXED_RECORDS)))
+    single = np.vstack([np.column_stack(model.predict_batch(preprocess_input(record)))
+                        for record in MIXED_RECORDS])
+    np.testing.assert_allclose(batch, single)
+
+def test_loan_percent_income_is_derived_when_amount_and_income_are_given():
+    row = preprocess_input({**APPLICANT, 'loan_percent_income': 0.9})
+    assert row['loan_percent_income'][0] == pytest.approx(APPLICANT['loan_amnt'] / APPLICANT['person_income'])
+
+@pytest.mark.parametrize('q', [0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0])
+def test_quantile_sketch_matches_numpy(q):
+    # Integers below 10**4 are exact at the sketch's four significant digits
+    values = np.random.default_rng(0).integers(0, 5000, 10_001).astype(np.float64)
+    sketch = QuantileSketch().update(values[:4000]).merge(QuantileSketch().update(values[4000:]))
+    assert sketch.quantile(q) == pytest.approx(np.quantile(values, q))
+
+def test_quantile_sketch_ignores_missing_values():
+    sketch = QuantileSketch().update([1.0, np.nan, 3.0, np.inf])
+    assert sketch.count == 2
+    assert sketch.quantile(0.5) == pytest.approx(2.0)